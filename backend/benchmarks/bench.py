@@ -0,0 +1,316 @@
+"""
+Microbenchmarks for the backend hot paths.
+Everything runs against synthetic data in a temporary cache directory, and
+Twitter is replaced by an in-process mock transport, so no network is used.
+
+Run the suite and compare it with the stored baseline:
+$ python benchmarks/bench.py run --output results.json
+$ python benchmarks/bench.py compare benchmarks/baseline.json results.json
+
+Re-record the baseline (after an intended change, on the reference machine):
+$ python benchmarks/bench.py run --output benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir / "src"))
+# twitter_service refuses to import without a token; the mock transport never checks it
+os.environ.setdefault("TWITTER_BEARER_TOKEN", "benchmark")
+
+import httpx
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import api
+import twitter_service
+from graph_snapshot import export_snapshot, load_snapshot
+from identity_index import IdentityIndex
+from ttl_policy import TTLPolicy
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+# A benchmark regresses when its median is this much slower than the baseline
+DEFAULT_THRESHOLD = 1.5
+# Each benchmark runs for roughly this long (seconds), in REPEATS timed rounds
+TARGET_TIME = 0.2
+REPEATS = 7
+
+CACHE_SIZES = (10, 1_000, 50_000)
+INTERSECTION_SIZES = (500, 5_000, 50_000)
+HYDRATION_SIZES = (100, 1_000, 5_000)
+MUTUALS_SIZES = (50, 500, 5_000)
+# Crawled users in the follow graph, each following FOLLOWING_PER_USER of a shared pool
+CRAWL_SIZES = (100, 1_000, 5_000)
+FOLLOWING_PER_USER = 200
+
+rng = random.Random(42)
+# Profiles the mock Twitter API knows about, generated up front so they aren't timed
+_profiles: Dict[str, Dict] = {}
+
+
+def _fake_id() -> str:
+    return str(rng.randrange(10**17, 2**62))
+
+
+def _fake_user(user_id: str) -> Dict:
+    return {
+        "id": user_id,
+        "name": f"User {user_id[-6:]}",
+        "username": f"user{user_id[-8:]}",
+        "profile_image_url": f"https://pbs.twimg.com/profile_images/{user_id}/photo_normal.jpg",
+        "description": "Building things on the internet. Opinions are my own.",
+        "public_metrics": {
+            "followers_count": rng.randrange(10**6),
+            "following_count": rng.randrange(5_000),
+            "tweet_count": rng.randrange(10**5),
+            "listed_count": rng.randrange(1_000)
+        }
+    }
+
+
+def _overlapping_ids(size: int, overlap: float = 0.2) -> Tuple[List[str], List[str]]:
+    """Two following lists of `size` IDs sharing about `overlap` of their entries."""
+    shared = [_fake_id() for _ in range(int(size * overlap))]
+    first = shared + [_fake_id() for _ in range(size - len(shared))]
+    second = shared + [_fake_id() for _ in range(size - len(shared))]
+    rng.shuffle(first)
+    rng.shuffle(second)
+    return first, second
+
+
+def _mock_twitter(request: httpx.Request) -> httpx.Response:
+    """Answer /2/users lookups with synthetic profiles."""
+    ids = request.url.params["ids"].split(",")
+    return httpx.Response(200, json={"data": [_profiles[user_id] for user_id in ids]})
+
+
+def _time(func: Callable[[], object]) -> Dict:
+    """
+    Time func like timeit: pick a loop count that fills TARGET_TIME, then take
+    REPEATS rounds with garbage collection paused.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed * REPEATS >= TARGET_TIME or loops >= 10**6:
+            break
+        loops *= 2 if elapsed * REPEATS * 10 >= TARGET_TIME else 10
+
+    rounds = []
+    for _ in range(REPEATS):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for _ in range(loops):
+                func()
+            rounds.append((time.perf_counter() - start) / loops)
+        finally:
+            gc.enable()
+    return {
+        "median": statistics.median(rounds),
+        "min": min(rounds),
+        "loops": loops
+    }
+
+
+def bench_cache(results: Dict) -> None:
+    for size in CACHE_SIZES:
+        key = f"users_bench{size}"
+        data = [_fake_user(_fake_id()) for _ in range(size)]
+        results[f"cache_save[{size}]"] = _time(lambda: twitter_service._save_to_cache(key, data))
+        results[f"cache_load[{size}]"] = _time(lambda: twitter_service._load_from_cache(key))
+
+
+def bench_intersection(results: Dict, cache_dir: Path) -> None:
+    for size in INTERSECTION_SIZES:
+        first, second = _overlapping_ids(size)
+        results[f"intersect_sets[{size}]"] = _time(lambda: list(set(first) & set(second)))
+
+        # The same lists through the memory-mapped snapshot, as get_mutual_following
+        # intersects two users that are both in it
+        snapshot_dir = cache_dir / f"snapshot{size}"
+        snapshot_dir.mkdir()
+        for user_id, following in (("1", first), ("2", second)):
+            with open(snapshot_dir / f"following_{user_id}_{size}.json", "w") as f:
+                json.dump({"cached_at": "2030-01-01T00:00:00", "data": following}, f)
+        export_snapshot(snapshot_dir, snapshot_dir / "following_graph.csr")
+        snapshot = load_snapshot(snapshot_dir / "following_graph.csr")
+        results[f"intersect_snapshot[{size}]"] = _time(
+            lambda: [str(followed_id) for followed_id in snapshot.intersect("1", "2").tolist()]
+        )
+
+
+def bench_follower_index(results: Dict, loop: asyncio.AbstractEventLoop) -> None:
+    real_cache_dir = twitter_service.CACHE_DIR
+    try:
+        for size in CRAWL_SIZES:
+            crawl_dir = real_cache_dir / f"crawl{size}"
+            crawl_dir.mkdir()
+            pool = [_fake_id() for _ in range(size * 10)]
+            user_ids = [_fake_id() for _ in range(size)]
+            for user_id in user_ids:
+                with open(crawl_dir / f"following_{user_id}_500.json", "w") as f:
+                    json.dump({"cached_at": "2030-01-01T00:00:00", "data": rng.sample(pool, FOLLOWING_PER_USER)}, f)
+            export_snapshot(crawl_dir, crawl_dir / "following_graph.csr")
+            twitter_service.CACHE_DIR = crawl_dir
+            twitter_service._following_written_at = None
+            twitter_service.GRAPH_SNAPSHOT = load_snapshot(crawl_dir / "following_graph.csr")
+
+            # What the first /users/{username}/crawled-followers pays (in a worker
+            # thread) to set up the follower index
+            results[f"follower_index_build[{size}]"] = _time(twitter_service._build_follower_index)
+            twitter_service._follower_index = twitter_service._build_follower_index()
+            results[f"crawled_followers[{size}]"] = _time(
+                lambda: loop.run_until_complete(twitter_service.get_crawled_followers(pool[0]))
+            )
+    finally:
+        twitter_service.CACHE_DIR = real_cache_dir
+        twitter_service.GRAPH_SNAPSHOT = None
+        twitter_service._follower_index = None
+        twitter_service._following_written_at = None
+
+
+def bench_hydration(results: Dict, loop: asyncio.AbstractEventLoop) -> None:
+    real_client = httpx.AsyncClient
+    twitter_service.httpx.AsyncClient = lambda *args, **kwargs: real_client(
+        transport=httpx.MockTransport(_mock_twitter)
+    )
+    try:
+        for size in HYDRATION_SIZES:
+            user_ids = [_fake_id() for _ in range(size)]
+            _profiles.update((user_id, _fake_user(user_id)) for user_id in user_ids)
+            results[f"hydrate_users[{size}]"] = _time(lambda: loop.run_until_complete(
+                twitter_service.get_users_by_ids(user_ids, use_cache=False)
+            ))
+    finally:
+        twitter_service.httpx.AsyncClient = real_client
+
+
+def bench_mutuals_payload(results: Dict, loop: asyncio.AbstractEventLoop) -> None:
+    for size in MUTUALS_SIZES:
+        # Seed the cache so /mutuals builds its response without calling Twitter
+        user1, user2 = _fake_user(_fake_id()), _fake_user(_fake_id())
+        user1["username"], user2["username"] = f"bench{size}a", f"bench{size}b"
+        twitter_service._cache_user(user1)
+        twitter_service._cache_user(user2)
+        twitter_service._save_to_cache(
+            f"mutuals_{user1['id']}_{user2['id']}",
+            [_fake_user(_fake_id()) for _ in range(size)]
+        )
+        payload = loop.run_until_complete(api.get_mutuals(
+            user1=user1["username"],
+            user2=user2["username"],
+            max_calls=None,
+            timeout=20.0
+        ))
+        assert payload["mutual_count"] == size, "mutuals weren't served from the seeded cache"
+
+        # What FastAPI does with a route's return value when there is no response_model
+        results[f"mutuals_json[{size}]"] = _time(
+            lambda: JSONResponse(content=jsonable_encoder(payload)).body
+        )
+
+
+def run(output: Path) -> Dict:
+    """Run every benchmark and write the results to output."""
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = Path(temp_dir)
+        # Keep the real cache, TTL policy, identity index and snapshot out of reach
+        twitter_service.CACHE_DIR = cache_dir
+        twitter_service.TTL_POLICY = TTLPolicy(cache_dir / "ttl_policy.json", default_ttl=timedelta(days=365))
+        twitter_service.IDENTITY_INDEX = IdentityIndex(cache_dir / "identity_index.json", negative_ttl=timedelta(minutes=10))
+        twitter_service.GRAPH_SNAPSHOT = None
+
+        loop = asyncio.new_event_loop()
+        try:
+            bench_cache(results)
+            bench_intersection(results, cache_dir)
+            bench_follower_index(results, loop)
+            bench_hydration(results, loop)
+            bench_mutuals_payload(results, loop)
+        finally:
+            loop.close()
+
+    report = {
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "numpy": np.__version__,
+        "results": results
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, timing in results.items():
+        print(f"{name:32} {timing['median'] * 1e3:10.3f} ms")
+    print(f"Wrote {len(results)} results to {output}")
+    return report
+
+
+def compare(baseline_path: Path, results_path: Path, threshold: float = DEFAULT_THRESHOLD) -> bool:
+    """
+    Compare median timings against a baseline.
+
+    Returns:
+        True if no benchmark is more than `threshold` times slower than its baseline
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)["results"]
+    with open(results_path, "r") as f:
+        current = json.load(f)["results"]
+
+    regressions = []
+    for name in list(current) + [name for name in baseline if name not in current]:
+        if name not in baseline or name not in current:
+            print(f"{name:32} {'only in ' + ('results' if name in current else 'baseline'):>24}")
+            continue
+        ratio = current[name]["median"] / baseline[name]["median"]
+        flag = "REGRESSION" if ratio > threshold else ""
+        print(
+            f"{name:32} {baseline[name]['median'] * 1e3:10.3f} ms -> "
+            f"{current[name]['median'] * 1e3:10.3f} ms  {ratio:5.2f}x  {flag}"
+        )
+        if flag:
+            regressions.append(name)
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {threshold:.2f}x: {', '.join(regressions)}")
+    else:
+        print(f"No regressions beyond {threshold:.2f}x")
+    return not regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+
+    compare_parser = commands.add_parser("compare", help="Compare results with a baseline")
+    compare_parser.add_argument("baseline", type=Path, nargs="?", default=BASELINE_PATH)
+    compare_parser.add_argument("results", type=Path, nargs="?", default=Path("benchmark_results.json"))
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="Slowdown ratio that counts as a regression")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args.output)
+    else:
+        sys.exit(0 if compare(args.baseline, args.results, args.threshold) else 1)
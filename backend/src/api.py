@@ -5,19 +5,43 @@ $ fastapi dev src/api.py
 """
 
 import random
-from typing import Dict, List
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+import image_proxy
+import layout
 import twitter_service
-from twitter_service import TwitterAPIError, RateLimitError
+from demo_data import DEMO_DATA, cached_json_response
+from image_proxy import ImageProxyError
+from twitter_service import (
+    TwitterAPIError,
+    RateLimitError,
+    BudgetExceededError,
+    DeadlineExceededError,
+    CircuitOpenError
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Flush throttled cache state to disk when the server shuts down.
+    Mounted sub-apps don't get lifespan events, so main.py reuses this.
+    """
+    yield
+    twitter_service.flush_state()
+
 
 # The app which manages all of the API routes
 app = FastAPI(
     title="2 Degrees API",
     description="API for finding mutual connections between Twitter users",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow frontend to make requests
@@ -37,6 +61,97 @@ async def root() -> dict[str, str]:
     return {"message": "2 Degrees API", "status": "running"}
 
 
+@app.get("/metrics")
+async def get_metrics() -> Dict:
+    """
+    Get backend metrics for monitoring.
+    
+    Returns:
+        Rate limit budget and usage of every Twitter credential in the pool,
+        circuit breaker state, and cache TTLs and hit rates per entity type
+    """
+    return {
+        **twitter_service.get_metrics(),
+        "image_cache": image_proxy.get_stats()
+    }
+
+
+@app.get("/images")
+async def get_image(
+    request: Request,
+    url: str = Query(..., description="Original profile image URL"),
+    size: int = Query(128, description="Square size in pixels (48, 128 or 400)")
+) -> Response:
+    """
+    Get a profile image through the backend, resized and cached.
+    The image is fetched from its host once and then served from a local cache.
+    
+    Args:
+        url: Original profile image URL (e.g. a mutual's profile_image_url)
+        size: Square size in pixels
+    
+    Returns:
+        The resized image as WebP, with an ETag and long-lived Cache-Control
+    """
+    try:
+        data, etag = await image_proxy.get_image(url, size)
+    except ImageProxyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    headers = {"ETag": etag, "Cache-Control": image_proxy.CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type="image/webp", headers=headers)
+
+
+@app.get("/users")
+async def get_users(
+    usernames: str = Query(..., description="Comma-separated Twitter usernames (without @)")
+) -> Dict:
+    """
+    Get user information for many Twitter usernames in one request.
+    Cached users are served locally; the rest are looked up 100 at a time.
+    
+    Args:
+        usernames: Comma-separated Twitter usernames
+    
+    Returns:
+        Dictionary with the users found and the usernames that don't exist
+    """
+    requested = [username.strip() for username in usernames.split(",") if username.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail="No usernames given")
+    
+    try:
+        users = await twitter_service.get_users_by_usernames(requested)
+    except RateLimitError as e:
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "Rate limit exceeded",
+                "message": str(e),
+                "retry_after": e.retry_after,
+                "help": "Twitter API rate limit reached. Please wait before trying again."
+            }
+        )
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Twitter API unavailable",
+                "message": str(e),
+                "retry_after": e.retry_after
+            }
+        )
+    except TwitterAPIError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return {
+        "users": [user for user in users.values() if user],
+        "not_found": [username for username, user in users.items() if not user]
+    }
+
+
 @app.get("/users/{username}")
 async def get_user(username: str) -> Dict:
     """
@@ -63,6 +178,15 @@ async def get_user(username: str) -> Dict:
                 "help": "Twitter API rate limit reached. Please wait before trying again."
             }
         )
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Twitter API unavailable",
+                "message": str(e),
+                "retry_after": e.retry_after
+            }
+        )
     except TwitterAPIError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except HTTPException:
@@ -71,10 +195,70 @@ async def get_user(username: str) -> Dict:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/users/{username}/crawled-followers")
+async def get_crawled_followers(
+    username: str,
+    hydrate: bool = Query(False, description="Also return the followers' profiles (may call Twitter)")
+) -> Dict:
+    """
+    Get the users we have already crawled that follow a user.
+    Answered from the follower index without fetching any following list; any
+    two of the followers share the user as a mutual.
+    
+    Args:
+        username: Twitter username (handle without @)
+        hydrate: Whether to include the followers' profiles
+    
+    Returns:
+        The user, the IDs of their crawled followers and, if hydrated, their profiles
+    """
+    try:
+        user = await twitter_service.get_user_by_username(username)
+        if not user:
+            raise HTTPException(status_code=404, detail=f"User '{username}' not found")
+        
+        follower_ids = await twitter_service.get_crawled_followers(user["id"])
+        response = {
+            "user": {
+                "id": user["id"],
+                "name": user["name"],
+                "username": user["username"]
+            },
+            "follower_ids": follower_ids,
+            "follower_count": len(follower_ids)
+        }
+        if hydrate:
+            response["followers"] = await twitter_service.get_users_by_ids(follower_ids)
+        return response
+    except RateLimitError as e:
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "Rate limit exceeded",
+                "message": str(e),
+                "retry_after": e.retry_after,
+                "help": "Twitter API rate limit reached. Please wait before trying again."
+            }
+        )
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Twitter API unavailable",
+                "message": str(e),
+                "retry_after": e.retry_after
+            }
+        )
+    except TwitterAPIError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/mutuals")
 async def get_mutuals(
     user1: str = Query(..., description="First Twitter username (without @)"),
-    user2: str = Query(..., description="Second Twitter username (without @)")
+    user2: str = Query(..., description="Second Twitter username (without @)"),
+    max_calls: Optional[int] = Query(None, ge=0, description="Maximum number of upstream Twitter API calls to spend"),
+    timeout: float = Query(20.0, gt=0, le=120, description="Seconds before returning the mutuals found so far")
 ) -> Dict:
     """
     Get mutual accounts that both users follow.
@@ -82,22 +266,37 @@ async def get_mutuals(
     Args:
         user1: First Twitter username
         user2: Second Twitter username
+        max_calls: Upstream call budget used to choose the query plan
+        timeout: Deadline for the whole request, in seconds
     
     Returns:
-        Dictionary containing both users' info and list of mutual connections
+        Dictionary containing both users' info, list of mutual connections
+        and the query plan that was used. If the deadline is reached while
+        fetching mutuals' profiles, the ones fetched so far are returned with
+        `partial` set to true.
     """
+    deadline = time.monotonic() + timeout
     try:
         # Get both users' info
-        user1_data = await twitter_service.get_user_by_username(user1)
-        user2_data = await twitter_service.get_user_by_username(user2)
+        user1_data = await twitter_service.get_user_by_username(user1, deadline=deadline)
+        user2_data = await twitter_service.get_user_by_username(user2, deadline=deadline)
         
         if not user1_data:
             raise HTTPException(status_code=404, detail=f"User '{user1}' not found")
         if not user2_data:
             raise HTTPException(status_code=404, detail=f"User '{user2}' not found")
         
-        # Get mutual connections
-        mutual_users = await twitter_service.get_mutual_following(user1, user2)
+        # Pick the most accurate query plan within budget (the cheapest of equally
+        # accurate ones), then get mutual connections
+        plan = twitter_service.plan_mutual_following(user1_data, user2_data, max_calls=max_calls)
+        try:
+            mutual_users = await twitter_service.get_mutual_following(user1, user2, plan=plan, deadline=deadline)
+            partial = False
+        except DeadlineExceededError as e:
+            if e.partial_result is None:
+                raise
+            mutual_users = e.partial_result
+            partial = True
         
         return {
             "user1": {
@@ -128,8 +327,35 @@ async def get_mutuals(
                 for user in mutual_users
             ],
             "mutual_count": len(mutual_users),
-            "note": "Results are limited to first 500 following per user due to API rate limits. Data is cached for 24 hours."
+            "partial": partial,
+            "plan": {
+                "strategy": plan["strategy"],
+                "cost": plan["cost"],
+                "exact": plan["exact"],
+                "budget": plan["budget"]
+            },
+            "note": "Results are limited to first 500 following per user due to API rate limits. Cache lifetimes adapt to how often the data changes (30 minutes to 7 days)."
         }
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Twitter API unavailable",
+                "message": str(e),
+                "retry_after": e.retry_after
+            }
+        )
+    except BudgetExceededError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "Call budget too small",
+                "message": str(e),
+                "options": e.plan["options"] if e.plan else []
+            }
+        )
     except RateLimitError as e:
         raise HTTPException(
             status_code=429,
@@ -150,8 +376,76 @@ async def get_mutuals(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/mutuals/estimate")
+async def get_mutuals_estimate(
+    users: List[str] = Query(..., description="Two or more Twitter usernames (without @)")
+) -> Dict:
+    """
+    Estimate the number of mutual accounts and the Jaccard similarity of
+    two or more users' following sets.
+    Uses cached MinHash sketches only, so it never calls the Twitter API.
+    
+    Args:
+        users: Twitter usernames whose following lists have been fetched before
+    
+    Returns:
+        Dictionary with the similarity, estimated mutual count and 95% error bounds
+    """
+    if len(users) < 2:
+        raise HTTPException(status_code=400, detail="At least two users are needed")
+    
+    try:
+        return twitter_service.estimate_mutual_overlap(users)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/cohort/overlap")
+async def get_cohort_overlap(
+    users: Optional[List[str]] = Query(None, description="Twitter usernames in the cohort (defaults to every cached user)"),
+    top_k: int = Query(5, ge=1, le=100, description="Maximum number of links per user"),
+    min_overlap: int = Query(1, ge=1, description="Minimum number of shared followees for a link")
+) -> Dict:
+    """
+    Get the strongest mutual-following links between every pair of users in a cohort,
+    for drawing the Universe view.
+    Computed in one sparse matrix product over cached following lists, without calling the Twitter API.
+    
+    Args:
+        users: Twitter usernames in the cohort
+        top_k: Maximum number of links returned per user
+        min_overlap: Minimum number of shared followees for a link
+    
+    Returns:
+        Dictionary with the cohort's users and, per user ID, its strongest links
+    """
+    try:
+        return twitter_service.get_cohort_overlap(users, top_k=top_k, min_overlap=min_overlap)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/universe/layout")
+async def get_universe_layout(
+    method: str = Query("force", pattern="^(ring|force)$", description="Layout method: ring or force"),
+    top_k: int = Query(5, ge=1, le=100, description="Links per user used by the force layout")
+) -> Dict:
+    """
+    Get precomputed star positions for the Universe view of every cached user,
+    so the client only has to render them.
+    
+    Args:
+        method: "ring" for degree rings only, "force" to relax them along mutual links
+        top_k: Links per user used by the force layout
+    
+    Returns:
+        Parallel "ids", "x", "y" and "ring" lists, with coordinates in [-1, 1]
+    """
+    return twitter_service.get_cohort_layout(method=method, top_k=top_k)
+
+
 @app.get("/demo/users/{username}")
-async def get_demo_user(username: str) -> Dict:
+async def get_demo_user(username: str, request: Request) -> Response:
     """
     Demo endpoint: Returns mock user data for testing/demonstration.
     Does not call Twitter API. Use this for demos when you want guaranteed fast responses.
@@ -164,91 +458,17 @@ async def get_demo_user(username: str) -> Dict:
     Returns:
         Mock user information including profile picture, bio, etc.
     """
-    demo_users = {
-        "alice": {
-            "id": "123456789",
-            "name": "Alice Johnson",
-            "username": "alice",
-            "profilePicture": "https://i.pravatar.cc/150?img=1",
-            "bio": "Software engineer and tech enthusiast 🚀 | Building the future one commit at a time",
-            "degree": 1,
-            "public_metrics": {
-                "followers_count": 1250,
-                "following_count": 350,
-                "tweet_count": 5420,
-                "listed_count": 45
-            }
-        },
-        "bob": {
-            "id": "987654321",
-            "name": "Bob Smith",
-            "username": "bob",
-            "profilePicture": "https://i.pravatar.cc/150?img=2",
-            "bio": "Product designer and coffee lover ☕ | Crafting beautiful user experiences",
-            "degree": 1,
-            "public_metrics": {
-                "followers_count": 890,
-                "following_count": 420,
-                "tweet_count": 3200,
-                "listed_count": 28
-            }
-        },
-        "charlie": {
-            "id": "555666777",
-            "name": "Charlie Brown",
-            "username": "charlie",
-            "profilePicture": "https://i.pravatar.cc/150?img=3",
-            "bio": "Developer advocate passionate about open source 🌟 | Sharing knowledge daily",
-            "degree": 2,
-            "public_metrics": {
-                "followers_count": 5600,
-                "following_count": 1200,
-                "tweet_count": 8900,
-                "listed_count": 120
-            }
-        },
-        "diana": {
-            "id": "444555666",
-            "name": "Diana Prince",
-            "username": "diana",
-            "profilePicture": "https://i.pravatar.cc/150?img=4",
-            "bio": "UX researcher and designer | Building better products through user insights",
-            "degree": 2,
-            "public_metrics": {
-                "followers_count": 3400,
-                "following_count": 800,
-                "tweet_count": 2100,
-                "listed_count": 67
-            }
-        },
-        "eve": {
-            "id": "333444555",
-            "name": "Eve Wilson",
-            "username": "eve",
-            "profilePicture": "https://i.pravatar.cc/150?img=5",
-            "bio": "Tech writer and blogger 📝 | Sharing insights on software development and tech trends",
-            "degree": 3,
-            "public_metrics": {
-                "followers_count": 2100,
-                "following_count": 600,
-                "tweet_count": 1500,
-                "listed_count": 35
-            }
-        }
-    }
-    
-    username_lower = username.lower()
-    if username_lower not in demo_users:
+    encoded = DEMO_DATA.user_response(username)
+    if encoded is None:
         raise HTTPException(
             status_code=404,
-            detail=f"Demo user '{username}' not found. Available demo users: {', '.join(demo_users.keys())}"
+            detail=f"Demo user '{username}' not found. Available demo users: {', '.join(DEMO_DATA.usernames)}"
         )
-    
-    return demo_users[username_lower]
+    return cached_json_response(encoded, request)
 
 
 @app.get("/demo/friends")
-async def get_demo_friends() -> List[Dict]:
+async def get_demo_friends(request: Request) -> Response:
     """
     Demo endpoint: Returns a list of mock friends for the Universe page.
     This mimics the friends.json structure used in the frontend.
@@ -256,149 +476,37 @@ async def get_demo_friends() -> List[Dict]:
     Returns:
         List of friend objects with username, profilePicture, bio, and degree
     """
-    demo_users = {
-        "alice": {
-            "username": "alice",
-            "profilePicture": "https://i.pravatar.cc/150?img=1",
-            "bio": "Software engineer and tech enthusiast 🚀 | Building the future one commit at a time",
-            "degree": 1
-        },
-        "bob": {
-            "username": "bob",
-            "profilePicture": "https://i.pravatar.cc/150?img=2",
-            "bio": "Product designer and coffee lover ☕ | Crafting beautiful user experiences",
-            "degree": 1
-        },
-        "charlie": {
-            "username": "charlie",
-            "profilePicture": "https://i.pravatar.cc/150?img=3",
-            "bio": "Developer advocate passionate about open source 🌟 | Sharing knowledge daily",
-            "degree": 2
-        },
-        "diana": {
-            "username": "diana",
-            "profilePicture": "https://i.pravatar.cc/150?img=4",
-            "bio": "UX researcher and designer | Building better products through user insights",
-            "degree": 2
-        },
-        "eve": {
-            "username": "eve",
-            "profilePicture": "https://i.pravatar.cc/150?img=5",
-            "bio": "Tech writer and blogger 📝 | Sharing insights on software development and tech trends",
-            "degree": 3
-        },
-        "frank": {
-            "username": "frank",
-            "profilePicture": "https://i.pravatar.cc/150?img=6",
-            "bio": "Full-stack developer and coffee addict",
-            "degree": 1
-        },
-        "grace": {
-            "username": "grace",
-            "profilePicture": "https://i.pravatar.cc/150?img=7",
-            "bio": "Data scientist exploring AI and machine learning",
-            "degree": 2
-        },
-        "henry": {
-            "username": "henry",
-            "profilePicture": "https://i.pravatar.cc/150?img=8",
-            "bio": "Mobile app developer building the next big thing",
-            "degree": 2
-        },
-        "iris": {
-            "username": "iris",
-            "profilePicture": "https://i.pravatar.cc/150?img=9",
-            "bio": "Frontend enthusiast and design system advocate",
-            "degree": 3
-        },
-        "jack": {
-            "username": "jack",
-            "profilePicture": "https://i.pravatar.cc/150?img=10",
-            "bio": "DevOps engineer automating everything",
-            "degree": 3
-        },
-        "kate": {
-            "username": "kate",
-            "profilePicture": "https://i.pravatar.cc/150?img=11",
-            "bio": "Security researcher keeping the web safe",
-            "degree": 3
-        },
-        "leo": {
-            "username": "leo",
-            "profilePicture": "https://i.pravatar.cc/150?img=12",
-            "bio": "Cloud architect building scalable solutions",
-            "degree": 3
-        },
-        "maya": {
-            "username": "maya",
-            "profilePicture": "https://i.pravatar.cc/150?img=13",
-            "bio": "Game developer creating immersive experiences",
-            "degree": 3
-        },
-        "nick": {
-            "username": "nick",
-            "profilePicture": "https://i.pravatar.cc/150?img=14",
-            "bio": "Blockchain developer exploring Web3",
-            "degree": 3
-        },
-        "olivia": {
-            "username": "olivia",
-            "profilePicture": "https://i.pravatar.cc/150?img=15",
-            "bio": "QA engineer ensuring quality at every step",
-            "degree": 3
-        },
-        "paul": {
-            "username": "paul",
-            "profilePicture": "https://i.pravatar.cc/150?img=16",
-            "bio": "Technical writer documenting the future",
-            "degree": 3
-        },
-        "quinn": {
-            "username": "quinn",
-            "profilePicture": "https://i.pravatar.cc/150?img=17",
-            "bio": "Site reliability engineer keeping systems running",
-            "degree": 3
-        },
-        "rachel": {
-            "username": "rachel",
-            "profilePicture": "https://i.pravatar.cc/150?img=18",
-            "bio": "Product manager shipping great products",
-            "degree": 3
-        },
-        "sam": {
-            "username": "sam",
-            "profilePicture": "https://i.pravatar.cc/150?img=19",
-            "bio": "Backend engineer optimizing performance",
-            "degree": 3
-        },
-        "tina": {
-            "username": "tina",
-            "profilePicture": "https://i.pravatar.cc/150?img=20",
-            "bio": "UI/UX designer crafting beautiful interfaces",
-            "degree": 3
-        },
-        "uma": {
-            "username": "uma",
-            "profilePicture": "https://i.pravatar.cc/150?img=21",
-            "bio": "Database administrator managing petabytes",
-            "degree": 3
-        },
-        "victor": {
-            "username": "victor",
-            "profilePicture": "https://i.pravatar.cc/150?img=22",
-            "bio": "Systems programmer working close to the metal",
-            "degree": 3
-        }
-    }
+    return cached_json_response(DEMO_DATA.friends_response(), request)
+
+
+@app.get("/demo/layout")
+async def get_demo_layout(
+    method: str = Query("ring", pattern="^(ring|force)$", description="Layout method: ring or force")
+) -> Dict:
+    """
+    Demo endpoint: Returns precomputed star positions for the demo friends,
+    keyed by username and placed on rings by degree.
+    
+    Args:
+        method: "ring" or "force"
     
-    return list(demo_users.values())
+    Returns:
+        Parallel "ids", "x", "y" and "ring" lists, with coordinates in [-1, 1]
+    """
+    return layout.get_layout(
+        "demo",
+        [friend["username"] for friend in DEMO_DATA.friends],
+        [friend["degree"] for friend in DEMO_DATA.friends],
+        method=method
+    )
 
 
 @app.get("/demo/mutuals")
 async def get_demo_mutuals(
+    request: Request,
     user1: str = Query(..., description="First Twitter username (without @)"),
     user2: str = Query(..., description="Second Twitter username (without @)")
-) -> Dict:
+) -> Response:
     """
     Demo endpoint: Returns mock mutual connections data for testing/demonstration.
     Does not call Twitter API. Use this for demos when you want guaranteed fast responses.
@@ -412,158 +520,14 @@ async def get_demo_mutuals(
     Returns:
         Dictionary containing both users' info and list of mock mutual connections
     """
-    demo_users = {
-        "alice": {
-            "id": "123456789",
-            "name": "Alice Johnson",
-            "username": "alice",
-            "profile_image_url": "https://pbs.twimg.com/profile_images/1234567890/example1_normal.jpg",
-            "description": "Software engineer and tech enthusiast 🚀 | Building the future one commit at a time",
-            "public_metrics": {
-                "followers_count": 1250,
-                "following_count": 350,
-                "tweet_count": 5420,
-                "listed_count": 45
-            }
-        },
-        "bob": {
-            "id": "987654321",
-            "name": "Bob Smith",
-            "username": "bob",
-            "profile_image_url": "https://pbs.twimg.com/profile_images/9876543210/example2_normal.jpg",
-            "description": "Product designer and coffee lover ☕ | Crafting beautiful user experiences",
-            "public_metrics": {
-                "followers_count": 890,
-                "following_count": 420,
-                "tweet_count": 3200,
-                "listed_count": 28
-            }
-        },
-        "charlie": {
-            "id": "555666777",
-            "name": "Charlie Brown",
-            "username": "charlie",
-            "profile_image_url": "https://pbs.twimg.com/profile_images/5556667770/example3_normal.jpg",
-            "description": "Developer advocate passionate about open source 🌟 | Sharing knowledge daily",
-            "public_metrics": {
-                "followers_count": 5600,
-                "following_count": 1200,
-                "tweet_count": 8900,
-                "listed_count": 120
-            }
-        },
-        "diana": {
-            "id": "444555666",
-            "name": "Diana Prince",
-            "username": "diana",
-            "profile_image_url": "https://pbs.twimg.com/profile_images/4445556660/example4_normal.jpg",
-            "description": "UX researcher and designer | Building better products through user insights",
-            "public_metrics": {
-                "followers_count": 3400,
-                "following_count": 800,
-                "tweet_count": 2100,
-                "listed_count": 67
-            }
-        },
-        "eve": {
-            "id": "333444555",
-            "name": "Eve Wilson",
-            "username": "eve",
-            "profile_image_url": "https://pbs.twimg.com/profile_images/3334445550/example5_normal.jpg",
-            "description": "Tech writer and blogger 📝 | Sharing insights on software development and tech trends",
-            "public_metrics": {
-                "followers_count": 2100,
-                "following_count": 600,
-                "tweet_count": 1500,
-                "listed_count": 35
-            }
-        }
-    }
-    
-    user1_lower = user1.lower()
-    user2_lower = user2.lower()
-    
-    if user1_lower not in demo_users:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Demo user '{user1}' not found. Available demo users: {', '.join(demo_users.keys())}"
-        )
-    if user2_lower not in demo_users:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Demo user '{user2}' not found. Available demo users: {', '.join(demo_users.keys())}"
-        )
+    for username in (user1, user2):
+        if DEMO_DATA.user_response(username) is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Demo user '{username}' not found. Available demo users: {', '.join(DEMO_DATA.usernames)}"
+            )
     
-    # Mock mutual connections - different sets based on user combinations
-    # For alice & bob, return charlie, diana, eve as mutuals
-    # For other combinations, return a subset
-    if (user1_lower == "alice" and user2_lower == "bob") or (user1_lower == "bob" and user2_lower == "alice"):
-        mutual_users = [
-            {
-                "id": "555666777",
-                "name": "Charlie Brown",
-                "username": "charlie",
-                "profile_image_url": "https://pbs.twimg.com/profile_images/5556667770/example3_normal.jpg",
-                "description": "Developer advocate passionate about open source 🌟 | Sharing knowledge daily",
-                "public_metrics": {
-                    "followers_count": 5600,
-                    "following_count": 1200,
-                    "tweet_count": 8900,
-                    "listed_count": 120
-                }
-            },
-            {
-                "id": "444555666",
-                "name": "Diana Prince",
-                "username": "diana",
-                "profile_image_url": "https://pbs.twimg.com/profile_images/4445556660/example4_normal.jpg",
-                "description": "UX researcher and designer | Building better products through user insights",
-                "public_metrics": {
-                    "followers_count": 3400,
-                    "following_count": 800,
-                    "tweet_count": 2100,
-                    "listed_count": 67
-                }
-            },
-            {
-                "id": "333444555",
-                "name": "Eve Wilson",
-                "username": "eve",
-                "profile_image_url": "https://pbs.twimg.com/profile_images/3334445550/example5_normal.jpg",
-                "description": "Tech writer and blogger 📝 | Sharing insights on software development and tech trends",
-                "public_metrics": {
-                    "followers_count": 2100,
-                    "following_count": 600,
-                    "tweet_count": 1500,
-                    "listed_count": 35
-                }
-            }
-        ]
-    else:
-        # For other combinations, return a smaller set or empty
-        mutual_users = [
-            {
-                "id": "555666777",
-                "name": "Charlie Brown",
-                "username": "charlie",
-                "profile_image_url": "https://pbs.twimg.com/profile_images/5556667770/example3_normal.jpg",
-                "description": "Developer advocate passionate about open source 🌟 | Sharing knowledge daily",
-                "public_metrics": {
-                    "followers_count": 5600,
-                    "following_count": 1200,
-                    "tweet_count": 8900,
-                    "listed_count": 120
-                }
-            }
-        ]
-    
-    return {
-        "user1": demo_users[user1_lower],
-        "user2": demo_users[user2_lower],
-        "mutuals": mutual_users,
-        "mutual_count": len(mutual_users),
-        "note": "This is demo/mock data for testing purposes. No Twitter API calls were made."
-    }
+    return cached_json_response(DEMO_DATA.mutuals_response(user1, user2), request)
 
 
 """
@@ -0,0 +1,66 @@
+"""
+Circuit breaker for upstream APIs.
+After several consecutive failures the circuit opens and requests fail fast for a
+cool-down period instead of piling up against an upstream that is down. Then a
+single trial request is let through: success closes the circuit, failure reopens it.
+"""
+import time
+from typing import Dict
+
+
+class CircuitBreaker:
+    """Tracks consecutive upstream failures and decides whether to let requests through."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial request
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+
+    def allow_request(self) -> bool:
+        """Check whether a request may be sent upstream now."""
+        if self.state == self.CLOSED:
+            return True
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            # Let one trial request through (again, if the last trial never reported back)
+            self.state = self.HALF_OPEN
+            self.opened_at = time.monotonic()
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def retry_after(self) -> int:
+        """Seconds until the circuit lets a trial request through."""
+        if self.state == self.CLOSED:
+            return 0
+        return max(0, int(self.reset_timeout - (time.monotonic() - self.opened_at)) + 1)
+
+    def snapshot(self) -> Dict:
+        """Describe the circuit's state for metrics."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected": self.rejected,
+            "retry_after": self.retry_after()
+        }
@@ -0,0 +1,85 @@
+"""
+Pairwise overlap of following sets for a whole cohort of users at once.
+Builds a sparse user-by-followee incidence matrix M from cached following lists,
+so that every pairwise mutual count is an entry of M @ M.T.
+"""
+from typing import Dict, List, Sequence
+
+import numpy as np
+from scipy import sparse
+
+
+def overlap_matrix(following: Dict[str, Sequence]) -> sparse.csr_matrix:
+    """
+    Compute the pairwise overlap counts of a cohort's following sets.
+
+    Args:
+        following: User ID -> IDs of the accounts that user follows, as strings
+            or (faster) as int64 arrays
+
+    Returns:
+        Sparse symmetric matrix whose entry (i, j) is the number of accounts
+        users i and j both follow, in the order of `following`. The diagonal is zero.
+    """
+    user_count = len(following)
+    lengths = np.fromiter((len(ids) for ids in following.values()), dtype=np.int64, count=user_count)
+    if user_count == 0 or lengths.sum() == 0:
+        return sparse.csr_matrix((user_count, user_count), dtype=np.int32)
+
+    followee_ids = np.concatenate([np.asarray(ids, dtype=np.int64) for ids in following.values()])
+    # Map Twitter IDs to dense column numbers
+    _, columns = np.unique(followee_ids, return_inverse=True)
+    indptr = np.concatenate(([0], np.cumsum(lengths)))
+
+    # Each user's following list is already one CSR row, so build the matrix directly
+    incidence = sparse.csr_matrix(
+        (np.ones(len(columns), dtype=np.int32), columns.ravel(), indptr),
+        shape=(user_count, int(columns.max()) + 1)
+    )
+    # Duplicate IDs in a list would otherwise be counted more than once
+    incidence.sum_duplicates()
+    incidence.data[:] = 1
+
+    overlaps = (incidence @ incidence.T).tocsr()
+    overlaps.setdiag(0)
+    overlaps.eliminate_zeros()
+    return overlaps
+
+
+def top_links(
+    following: Dict[str, Sequence],
+    top_k: int = 5,
+    min_overlap: int = 1
+) -> Dict[str, List[Dict]]:
+    """
+    Find each user's strongest links within a cohort.
+
+    Args:
+        following: User ID -> IDs of the accounts that user follows
+        top_k: Maximum number of links returned per user
+        min_overlap: Minimum number of shared followees for a link
+
+    Returns:
+        User ID -> list of {"id", "overlap"} for the users sharing the most followees, strongest first
+    """
+    user_ids = list(following)
+    overlaps = overlap_matrix(following)
+
+    links = {}
+    for row, user_id in enumerate(user_ids):
+        start, end = overlaps.indptr[row], overlaps.indptr[row + 1]
+        counts = overlaps.data[start:end]
+        neighbours = overlaps.indices[start:end]
+
+        keep = counts >= min_overlap
+        counts, neighbours = counts[keep], neighbours[keep]
+        if len(counts) > top_k:
+            best = np.argpartition(-counts, top_k - 1)[:top_k]
+            counts, neighbours = counts[best], neighbours[best]
+        order = np.argsort(-counts, kind="stable")
+
+        links[user_id] = [
+            {"id": user_ids[neighbours[i]], "overlap": int(counts[i])}
+            for i in order
+        ]
+    return links
@@ -0,0 +1,162 @@
+"""
+Pool of Twitter bearer tokens with per-token rate limit budgets.
+Each token tracks the budget Twitter reports in the `x-rate-limit-*` response
+headers for every endpoint it calls, so requests can be routed to whichever
+credential has the most calls left. Exhausted tokens are benched until reset.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class CredentialPool:
+    """
+    Routes upstream requests across several bearer tokens.
+
+    Budgets are tracked per token *and* per endpoint bucket (e.g. "following",
+    "users"), because Twitter rate limits each endpoint independently.
+    """
+
+    def __init__(self, tokens: List[str]):
+        # Drop blanks and duplicates while keeping the configured order
+        unique_tokens = list(dict.fromkeys(token.strip() for token in tokens if token and token.strip()))
+        if not unique_tokens:
+            raise ValueError("CredentialPool needs at least one bearer token")
+
+        self.tokens = unique_tokens
+        # (token, bucket) -> {"limit", "remaining", "reset_at"}
+        self._budgets: Dict[Tuple[str, str], Dict] = {}
+        # token -> {"requests", "rate_limited"}
+        self._counters: Dict[str, Dict[str, int]] = {
+            token: {"requests": 0, "rate_limited": 0} for token in self.tokens
+        }
+        # (token, bucket) -> sequence number of the last call handed out, for round-robin ties
+        self._last_used: Dict[Tuple[str, str], int] = {}
+        self._sequence = 0
+
+    def _budget(self, token: str, bucket: str, now: float) -> Dict:
+        """Get the budget for a token/bucket, restoring it once its window has reset."""
+        budget = self._budgets.setdefault(
+            (token, bucket),
+            {"limit": None, "remaining": None, "reset_at": None}
+        )
+        if budget["reset_at"] is not None and budget["reset_at"] <= now:
+            # Window is over, so the full limit is available again
+            budget["remaining"] = budget["limit"]
+            budget["reset_at"] = None
+        return budget
+
+    @staticmethod
+    def _is_benched(budget: Dict, now: float) -> bool:
+        return (
+            budget["remaining"] is not None
+            and budget["remaining"] <= 0
+            and budget["reset_at"] is not None
+            and budget["reset_at"] > now
+        )
+
+    def acquire(self, bucket: str) -> Optional[str]:
+        """
+        Pick the token with the most remaining budget for an endpoint bucket.
+
+        Tokens that have never called the bucket are assumed to have a full
+        budget and are tried first. One call is reserved on the chosen token, and
+        ties (e.g. tokens whose budget isn't known yet) go to the least recently
+        used token, so concurrent requests spread across the pool instead of
+        piling onto one token.
+
+        Returns:
+            A bearer token, or None if every token is benched for this bucket
+        """
+        now = time.time()
+        best_token = None
+        best_key = None
+
+        for token in self.tokens:
+            budget = self._budget(token, bucket, now)
+            if self._is_benched(budget, now):
+                continue
+            remaining = float("inf") if budget["remaining"] is None else budget["remaining"]
+            key = (remaining, -self._last_used.get((token, bucket), 0))
+            if best_key is None or key > best_key:
+                best_token = token
+                best_key = key
+
+        if best_token is None:
+            return None
+
+        budget = self._budget(best_token, bucket, now)
+        if budget["remaining"] is not None:
+            budget["remaining"] -= 1
+        self._sequence += 1
+        self._last_used[(best_token, bucket)] = self._sequence
+        self._counters[best_token]["requests"] += 1
+        return best_token
+
+    def record_response(self, token: str, bucket: str, headers) -> None:
+        """Update a token's budget from the rate limit headers of a response."""
+        budget = self._budget(token, bucket, time.time())
+        try:
+            if "x-rate-limit-limit" in headers:
+                budget["limit"] = int(headers["x-rate-limit-limit"])
+            if "x-rate-limit-remaining" in headers:
+                budget["remaining"] = int(headers["x-rate-limit-remaining"])
+            if "x-rate-limit-reset" in headers:
+                budget["reset_at"] = float(headers["x-rate-limit-reset"])
+        except ValueError:
+            # Malformed headers, keep the previous estimate
+            pass
+
+    def bench(self, token: str, bucket: str, reset_at: Optional[float] = None) -> None:
+        """
+        Take a token out of rotation for a bucket until its window resets.
+
+        Args:
+            token: Bearer token that was rate limited
+            bucket: Endpoint bucket it was rate limited on
+            reset_at: Epoch seconds when the window resets (defaults to 15 minutes)
+        """
+        now = time.time()
+        budget = self._budget(token, bucket, now)
+        budget["remaining"] = 0
+        budget["reset_at"] = reset_at if reset_at and reset_at > now else now + 900
+        self._counters[token]["rate_limited"] += 1
+
+    def retry_after(self, bucket: str) -> int:
+        """Seconds until the first benched token for a bucket becomes usable again."""
+        now = time.time()
+        resets = [
+            budget["reset_at"]
+            for (_, budget_bucket), budget in self._budgets.items()
+            if budget_bucket == bucket and self._is_benched(budget, now)
+        ]
+        if not resets:
+            return 0
+        return max(0, int(min(resets) - now) + 1)
+
+    def snapshot(self) -> List[Dict]:
+        """
+        Describe the state of every token in the pool for metrics.
+        Tokens are masked so the snapshot is safe to expose over the API.
+        """
+        now = time.time()
+        credentials = []
+        for index, token in enumerate(self.tokens):
+            buckets = {}
+            for (budget_token, bucket) in list(self._budgets):
+                if budget_token != token:
+                    continue
+                budget = self._budget(token, bucket, now)
+                buckets[bucket] = {
+                    "limit": budget["limit"],
+                    "remaining": budget["remaining"],
+                    "reset_in": max(0, int(budget["reset_at"] - now)) if budget["reset_at"] else None,
+                    "benched": self._is_benched(budget, now),
+                }
+            credentials.append({
+                "credential": index,
+                "token": f"...{token[-4:]}",
+                "requests": self._counters[token]["requests"],
+                "rate_limited": self._counters[token]["rate_limited"],
+                "buckets": buckets,
+            })
+        return credentials
@@ -0,0 +1,117 @@
+"""
+Demo dataset behind the /demo routes.
+The people and their mutuals live in demo_data.json. The file is loaded once,
+and every response the demo routes can give is encoded to JSON up front with
+its ETag, so a request only picks ready-made bytes out of a dict.
+"""
+import hashlib
+import itertools
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+DEMO_DATA_PATH = Path(__file__).parent / "demo_data.json"
+NOTE = "This is demo/mock data for testing purposes. No Twitter API calls were made."
+# Demo data only changes with a deploy, but clients must revalidate to notice
+CACHE_CONTROL = "no-cache"
+
+
+def _encode(content) -> Tuple[bytes, str]:
+    """Encode content exactly like FastAPI's JSONResponse, and compute its ETag."""
+    body = json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+    return body, f'"{hashlib.md5(body).hexdigest()}"'
+
+
+class DemoDataset:
+    """Demo people indexed by username, with pre-encoded responses for every demo route."""
+
+    def __init__(self, path: Path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        # Everyone on the Universe page, in display order
+        self.friends: List[Dict] = [
+            {
+                "username": person["username"],
+                "profilePicture": person["profilePicture"],
+                "bio": person["bio"],
+                "degree": person["degree"]
+            }
+            for person in data["users"]
+        ]
+        # Only people with a full profile can be looked up or compared
+        profiles = {person["username"]: person for person in data["users"] if "id" in person}
+        self.usernames: List[str] = list(profiles)
+
+        self._friends = _encode(self.friends)
+        self._users = {
+            username: _encode({
+                "id": person["id"],
+                "name": person["name"],
+                "username": person["username"],
+                "profilePicture": person["profilePicture"],
+                "bio": person["bio"],
+                "degree": person["degree"],
+                "public_metrics": person["public_metrics"]
+            })
+            for username, person in profiles.items()
+        }
+
+        twitter_users = {
+            username: {
+                "id": person["id"],
+                "name": person["name"],
+                "username": person["username"],
+                "profile_image_url": person["profile_image_url"],
+                "description": person["bio"],
+                "public_metrics": person["public_metrics"]
+            }
+            for username, person in profiles.items()
+        }
+        pair_mutuals = {frozenset(pair["users"]): pair["mutuals"] for pair in data["mutuals"]}
+        self._mutuals: Dict[Tuple[str, str], Tuple[bytes, str]] = {}
+        for user1, user2 in itertools.product(self.usernames, repeat=2):
+            mutuals = pair_mutuals.get(frozenset((user1, user2)), data["default_mutuals"])
+            self._mutuals[(user1, user2)] = _encode({
+                "user1": twitter_users[user1],
+                "user2": twitter_users[user2],
+                "mutuals": [twitter_users[username] for username in mutuals],
+                "mutual_count": len(mutuals),
+                "note": NOTE
+            })
+
+    def friends_response(self) -> Tuple[bytes, str]:
+        return self._friends
+
+    def user_response(self, username: str) -> Optional[Tuple[bytes, str]]:
+        return self._users.get(username.lower())
+
+    def mutuals_response(self, user1: str, user2: str) -> Optional[Tuple[bytes, str]]:
+        return self._mutuals.get((user1.lower(), user2.lower()))
+
+
+def cached_json_response(encoded: Tuple[bytes, str], request: Request) -> Response:
+    """
+    Serve pre-encoded JSON, or 304 when the client already has it.
+
+    Args:
+        encoded: (JSON bytes, ETag) from DemoDataset
+        request: Incoming request
+    """
+    body, etag = encoded
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+DEMO_DATA = DemoDataset(DEMO_DATA_PATH)
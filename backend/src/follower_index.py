@@ -0,0 +1,117 @@
+"""
+Inverted index of the crawled follow graph: for every followed account, the
+crawled users that follow it. Answers "who that we have crawled follows X"
+and mutuals of any two crawled users without calling Twitter.
+
+Lists in the graph snapshot are answered from its memory-mapped reverse CSR,
+so only lists fetched since the snapshot was written are indexed in memory.
+"""
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from graph_snapshot import GraphSnapshot
+
+
+class FollowerIndex:
+    """Following lists of crawled users, indexed both ways and updated in place."""
+
+    def __init__(self, snapshot: Optional[GraphSnapshot] = None):
+        """
+        Args:
+            snapshot: Graph snapshot whose lists are indexed until they're updated here
+        """
+        self.snapshot = snapshot
+        # Crawled user ID -> sorted int64 IDs they follow, for lists not taken from the snapshot
+        self._following: Dict[int, np.ndarray] = {}
+        # Crawled user ID -> (cached_at epoch seconds, max_results the list was fetched with)
+        self._fetched: Dict[int, Tuple[float, int]] = {}
+        # Followed user ID -> crawled user IDs following them, from the lists above
+        self._followers: Dict[int, Set[int]] = {}
+
+    def _snapshot_ids(self) -> np.ndarray:
+        if self.snapshot is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.asarray(self.snapshot.nodes)
+
+    def __len__(self) -> int:
+        return len(np.union1d(self._snapshot_ids(), np.fromiter(self._following, dtype=np.int64)))
+
+    def __contains__(self, user_id: str) -> bool:
+        return int(user_id) in self._following or (
+            self.snapshot is not None and self.snapshot.following(user_id) is not None
+        )
+
+    def update(self, user_id: str, following_ids: Sequence, cached_at: float, limit: int) -> bool:
+        """
+        Index a user's following list, replacing the one indexed before (or the
+        one in the snapshot). A list fetched with a smaller max_results than the
+        one indexed here is ignored.
+
+        Args:
+            user_id: Crawled user's ID
+            following_ids: IDs the user follows
+            cached_at: When the list was fetched (epoch seconds)
+            limit: max_results the list was fetched with
+
+        Returns:
+            Whether the index changed
+        """
+        user_id = int(user_id)
+        following = np.unique(np.asarray(following_ids, dtype=np.int64))
+        previous = self._following.get(user_id)
+
+        if previous is None:
+            added = following
+        else:
+            if limit < self._fetched[user_id][1]:
+                return False
+            # Only touch the entries that changed since the last fetch
+            added = np.setdiff1d(following, previous, assume_unique=True)
+            for followed_id in np.setdiff1d(previous, following, assume_unique=True).tolist():
+                followers = self._followers[followed_id]
+                followers.discard(user_id)
+                if not followers:
+                    del self._followers[followed_id]
+
+        for followed_id in added.tolist():
+            self._followers.setdefault(followed_id, set()).add(user_id)
+        self._following[user_id] = following
+        self._fetched[user_id] = (cached_at, limit)
+        return True
+
+    def following(self, user_id: str) -> Optional[Tuple[np.ndarray, float, int]]:
+        """
+        Look up a crawled user's following list.
+
+        Returns:
+            Tuple of (sorted int64 IDs, cached_at epoch seconds, max_results it
+            was fetched with), or None if the user isn't indexed
+        """
+        if int(user_id) in self._following:
+            return (self._following[int(user_id)], *self._fetched[int(user_id)])
+        if self.snapshot is not None:
+            return self.snapshot.following(user_id)
+        return None
+
+    def followers(self, user_id: str) -> List[str]:
+        """Get the crawled users that follow a user."""
+        follower_ids = set(self._followers.get(int(user_id), ()))
+        if self.snapshot is not None:
+            # Lists updated here replace the snapshot's, so their snapshot edges don't count
+            follower_ids.update(
+                follower_id for follower_id in self.snapshot.followers(user_id).tolist()
+                if follower_id not in self._following
+            )
+        return [str(follower_id) for follower_id in sorted(follower_ids)]
+
+    def stats(self) -> Dict:
+        snapshot_edges = 0
+        if self.snapshot is not None:
+            replaced = np.isin(self._snapshot_ids(), np.fromiter(self._following, dtype=np.int64))
+            snapshot_edges = int(np.diff(self.snapshot.offsets)[~replaced].sum())
+        return {
+            "crawled_users": len(self),
+            "indexed_in_memory": len(self._following),
+            "edges": snapshot_edges + sum(len(following) for following in self._following.values())
+        }
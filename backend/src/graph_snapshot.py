@@ -0,0 +1,184 @@
+"""
+Compact snapshot of the crawled follow graph in CSR (compressed sparse row) form.
+All cached following lists are packed into one file that is memory-mapped at
+startup, so following and follower lookups and intersections need no JSON
+parsing, and start-up time doesn't grow with the number of cached lists.
+
+File layout (all little-endian int64):
+    magic, version, node_count, edge_count, followed_count
+    nodes[node_count]                    crawled user IDs, sorted (the ID dictionary)
+    cached_at[node_count]                when each list was cached (epoch seconds)
+    limits[node_count]                   max_results each list was fetched with
+    offsets[node_count + 1]              row i is neighbours[offsets[i]:offsets[i + 1]]
+    neighbours[edge_count]               followed user IDs, sorted within each row
+    followed[followed_count]             every followed user ID, sorted
+    follower_offsets[followed_count + 1] the same edges reversed: row j is
+    followers[edge_count]                followers[follower_offsets[j]:follower_offsets[j + 1]]
+                                         crawled user IDs, sorted within each row
+
+Export the snapshot from the JSON cache with:
+$ python src/graph_snapshot.py
+"""
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = int.from_bytes(b"FGCSR\0\0\0", "little")
+VERSION = 2
+HEADER_SIZE = 5
+
+
+class GraphSnapshot:
+    """Read-only, memory-mapped view of a CSR snapshot file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        data = np.memmap(self.path, dtype="<i8", mode="r")
+        if len(data) < HEADER_SIZE or data[0] != MAGIC or data[1] != VERSION:
+            raise ValueError(f"{self.path} is not a follow graph snapshot")
+
+        node_count, edge_count, followed_count = int(data[2]), int(data[3]), int(data[4])
+        start = HEADER_SIZE
+        self.nodes = data[start:start + node_count]
+        start += node_count
+        self.cached_at = data[start:start + node_count]
+        start += node_count
+        self.limits = data[start:start + node_count]
+        start += node_count
+        self.offsets = data[start:start + node_count + 1]
+        start += node_count + 1
+        self.neighbours = data[start:start + edge_count]
+        start += edge_count
+        self.followed = data[start:start + followed_count]
+        start += followed_count
+        self.follower_offsets = data[start:start + followed_count + 1]
+        start += followed_count + 1
+        self.followers_of = data[start:start + edge_count]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def _row(self, user_id: str) -> Optional[int]:
+        user_id = int(user_id)
+        row = int(np.searchsorted(self.nodes, user_id))
+        if row < len(self.nodes) and self.nodes[row] == user_id:
+            return row
+        return None
+
+    def following(self, user_id: str) -> Optional[Tuple[np.ndarray, float, int]]:
+        """
+        Look up a user's following list without copying it.
+
+        Returns:
+            Tuple of (sorted int64 IDs, cached_at epoch seconds, max_results it
+            was fetched with), or None if the user isn't in the snapshot
+        """
+        row = self._row(user_id)
+        if row is None:
+            return None
+        neighbours = self.neighbours[self.offsets[row]:self.offsets[row + 1]]
+        return neighbours, float(self.cached_at[row]), int(self.limits[row])
+
+    def intersect(self, user_id1: str, user_id2: str) -> Optional[np.ndarray]:
+        """Get the IDs both users follow, or None if either isn't in the snapshot."""
+        row1, row2 = self._row(user_id1), self._row(user_id2)
+        if row1 is None or row2 is None:
+            return None
+        following1 = self.neighbours[self.offsets[row1]:self.offsets[row1 + 1]]
+        following2 = self.neighbours[self.offsets[row2]:self.offsets[row2 + 1]]
+        return np.intersect1d(following1, following2, assume_unique=True)
+
+    def followers(self, user_id: str) -> np.ndarray:
+        """Get the sorted IDs of the crawled users that follow a user, without copying them."""
+        user_id = int(user_id)
+        row = int(np.searchsorted(self.followed, user_id))
+        if row == len(self.followed) or self.followed[row] != user_id:
+            return self.followers_of[:0]
+        return self.followers_of[self.follower_offsets[row]:self.follower_offsets[row + 1]]
+
+    def user_ids(self) -> List[str]:
+        return [str(user_id) for user_id in self.nodes]
+
+
+def load_snapshot(path: Path) -> Optional[GraphSnapshot]:
+    """Memory-map a snapshot file, or return None if there isn't a valid one."""
+    try:
+        return GraphSnapshot(path)
+    except (OSError, ValueError):
+        return None
+
+
+def _read_cached_lists(cache_dir: Path) -> Dict[int, Tuple[List[str], float, int]]:
+    """Read the largest cached following list of every user from the JSON cache."""
+    lists = {}
+    for cache_path in cache_dir.glob("following_*_*.json"):
+        _, user_id, limit = cache_path.stem.split("_")
+        try:
+            with open(cache_path, "r") as f:
+                cached_data = json.load(f)
+            cached_at = datetime.fromisoformat(cached_data["cached_at"]).timestamp()
+            following = cached_data["data"]
+        except (json.JSONDecodeError, KeyError, ValueError, OSError):
+            continue
+        if not following:
+            continue
+
+        user_id, limit = int(user_id), int(limit)
+        if user_id not in lists or limit > lists[user_id][2]:
+            lists[user_id] = (following, cached_at, limit)
+    return lists
+
+
+def export_snapshot(cache_dir: Path, path: Path) -> int:
+    """
+    Pack every cached following list into a snapshot file.
+    The file is written next to its destination and renamed into place, so a
+    running server never maps a half-written snapshot.
+
+    Args:
+        cache_dir: JSON cache directory (with following_{id}_{max_results}.json files)
+        path: Snapshot file to write
+
+    Returns:
+        Number of users in the snapshot
+    """
+    lists = _read_cached_lists(Path(cache_dir))
+    nodes = np.array(sorted(lists), dtype="<i8")
+
+    rows = [np.unique(np.asarray(lists[user_id][0], dtype="<i8")) for user_id in nodes]
+    lengths = np.array([len(row) for row in rows], dtype="<i8")
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype("<i8")
+    neighbours = np.concatenate(rows).astype("<i8") if rows else np.zeros(0, dtype="<i8")
+    cached_at = np.array([lists[user_id][1] for user_id in nodes], dtype="<i8")
+    limits = np.array([lists[user_id][2] for user_id in nodes], dtype="<i8")
+
+    # Reverse every edge: group by followed ID, with the followers sorted within each group
+    sources = np.repeat(nodes, lengths)
+    order = np.lexsort((sources, neighbours))
+    followed, follower_counts = np.unique(neighbours[order], return_counts=True)
+    follower_offsets = np.concatenate(([0], np.cumsum(follower_counts))).astype("<i8")
+    followers = sources[order].astype("<i8")
+
+    header = np.array([MAGIC, VERSION, len(nodes), len(neighbours), len(followed)], dtype="<i8")
+    temp_path = Path(f"{path}.tmp")
+    with open(temp_path, "wb") as f:
+        for array in (
+            header, nodes, cached_at, limits, offsets, neighbours,
+            followed.astype("<i8"), follower_offsets, followers
+        ):
+            f.write(array.tobytes())
+    os.replace(temp_path, path)
+    return len(nodes)
+
+
+if __name__ == "__main__":
+    backend_dir = Path(__file__).parent.parent
+    cache_dir = backend_dir / "cache"
+    output = Path(sys.argv[1]) if len(sys.argv) > 1 else cache_dir / "following_graph.csr"
+    user_count = export_snapshot(cache_dir, output)
+    print(f"Wrote {user_count} following lists to {output}")
@@ -0,0 +1,168 @@
+"""
+Username <-> user ID index.
+Profiles and following lists are cached by the stable user ID; this index maps
+handles onto those IDs, follows renames by re-pointing the handle, and
+remembers handles Twitter doesn't know (typos, suspended accounts) for a short
+while so they don't cost an upstream call on every request.
+"""
+import json
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Append changes to the journal at most this often (seconds)
+PERSIST_INTERVAL = 10.0
+# The journal is folded into the index file once it has more entries than this,
+# or than the index has usernames, so rewriting the whole index stays rare
+COMPACT_MIN_ENTRIES = 1000
+
+
+class IdentityIndex:
+    """Persistent username <-> ID mapping with short-lived negative entries."""
+
+    def __init__(self, path: Path, negative_ttl: timedelta):
+        """
+        Args:
+            path: JSON file the index is persisted to; changes since it was
+                written are appended to a journal next to it
+            negative_ttl: How long a handle that doesn't exist is remembered
+        """
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix(".journal")
+        self.negative_ttl = negative_ttl.total_seconds()
+        # Lowercased username -> user ID, and back
+        self._ids: Dict[str, str] = {}
+        self._usernames: Dict[str, str] = {}
+        # Lowercased username -> epoch seconds until which it is known not to exist
+        self._missing: Dict[str, float] = {}
+        self.renames = 0
+        self.negative_hits = 0
+        # Changes not written to the journal yet, and entries already in it
+        self._pending: List[list] = []
+        self._journal_entries = 0
+        self._persisted_at = 0.0
+
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+            self._ids = saved["ids"]
+            self._missing = saved["missing"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            pass
+        self._usernames = {user_id: username for username, user_id in self._ids.items()}
+
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A write cut short by a crash
+                        continue
+                    self._apply(entry)
+                    self._journal_entries += 1
+        except OSError:
+            pass
+
+    def _apply(self, entry: list) -> bool:
+        """
+        Apply a journal entry: ["id", username, user_id] or ["missing", username, expires_at].
+
+        Returns:
+            Whether a user ID was re-pointed from a different username (a rename)
+        """
+        kind, username, value = entry
+        if kind == "missing":
+            user_id = self._ids.pop(username, None)
+            if user_id is not None:
+                self._usernames.pop(user_id, None)
+            self._missing[username] = value
+            return False
+
+        previous_username = self._usernames.get(value)
+        if previous_username is not None:
+            self._ids.pop(previous_username, None)
+        previous_owner = self._ids.get(username)
+        if previous_owner is not None:
+            self._usernames.pop(previous_owner, None)
+        self._ids[username] = value
+        self._usernames[value] = username
+        self._missing.pop(username, None)
+        return previous_username is not None and previous_username != username
+
+    def resolve(self, username: str) -> Optional[str]:
+        """Get the ID of a username, or None if it isn't indexed."""
+        return self._ids.get(username.lower())
+
+    def is_missing(self, username: str) -> bool:
+        """Whether Twitter recently reported that the username doesn't exist."""
+        expires_at = self._missing.get(username.lower())
+        if expires_at is None:
+            return False
+        if time.time() >= expires_at:
+            del self._missing[username.lower()]
+            return False
+        self.negative_hits += 1
+        return True
+
+    def record(self, user_id: str, username: str) -> bool:
+        """
+        Record that a username belongs to a user ID.
+        A user seen under a new handle is re-pointed, and a handle now held by
+        another account stops resolving to its previous owner.
+
+        Returns:
+            Whether the user ID was known under a different username (a rename)
+        """
+        username = username.lower()
+        if self._usernames.get(user_id) == username and username not in self._missing:
+            return False
+
+        entry = ["id", username, user_id]
+        renamed = self._apply(entry)
+        self.renames += int(renamed)
+        self._pending.append(entry)
+        self.persist()
+        return renamed
+
+    def record_missing(self, username: str) -> None:
+        """Remember for negative_ttl that a username doesn't exist."""
+        entry = ["missing", username.lower(), time.time() + self.negative_ttl]
+        self._apply(entry)
+        self._pending.append(entry)
+        self.persist()
+
+    def persist(self, force: bool = False) -> None:
+        """Append the changes since the last write to the journal, at most every PERSIST_INTERVAL seconds."""
+        if not self._pending or (not force and time.monotonic() - self._persisted_at < PERSIST_INTERVAL):
+            return
+        with open(self.journal_path, "a") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in self._pending))
+        self._journal_entries += len(self._pending)
+        self._pending = []
+        self._persisted_at = time.monotonic()
+
+        if self._journal_entries > max(COMPACT_MIN_ENTRIES, len(self._ids)):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the index file from memory and empty the journal."""
+        now = time.time()
+        self._missing = {username: expires_at for username, expires_at in self._missing.items() if expires_at > now}
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump({"ids": self._ids, "missing": self._missing}, f)
+        temp_path.replace(self.path)
+        # Replaying entries that are already in the index file is harmless, so
+        # a crash between these two steps loses nothing
+        self.journal_path.unlink(missing_ok=True)
+        self._journal_entries = 0
+
+    def stats(self) -> Dict:
+        return {
+            "usernames": len(self._ids),
+            "missing": len(self._missing),
+            "negative_hits": self.negative_hits,
+            "renames": self.renames
+        }
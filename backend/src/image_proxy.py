@@ -0,0 +1,222 @@
+"""
+Proxy for profile images.
+Each avatar is fetched from the image host once, resized to the few sizes the UI
+uses and kept in a size-bounded on-disk LRU cache, so pages with hundreds of
+stars don't make hundreds of third-party image requests.
+"""
+import asyncio
+import hashlib
+import io
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+from PIL import Image
+
+backend_dir = Path(__file__).parent.parent
+
+IMAGE_CACHE_DIR = backend_dir / "cache" / "images"
+IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+# Total size of resized images kept on disk before the least recently used are evicted
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+
+# Square sizes (px) the UI uses: list avatars, tooltip avatars at 2x, profile pages
+IMAGE_SIZES = (48, 128, 400)
+# Only proxy avatar hosts, so the route can't be used to fetch arbitrary URLs
+ALLOWED_HOSTS = {"pbs.twimg.com", "abs.twimg.com", "i.pravatar.cc"}
+
+# Largest upstream image downloaded; avatars are far smaller, anything bigger is refused
+MAX_UPSTREAM_BYTES = 5 * 1024 * 1024
+# Redirects followed per image, each only to an allowed host
+MAX_REDIRECTS = 3
+
+# Image URLs are content-addressed upstream, so responses can be cached for a long time
+CACHE_CONTROL = "public, max-age=2592000, immutable"
+
+# Path -> size in bytes of every cached image, in least to most recently used order
+_cache_index: Optional[Dict[Path, int]] = None
+_cache_bytes = 0
+# URL -> in-flight fetch, so concurrent requests for one avatar share a single download
+_pending_fetches: Dict[str, asyncio.Task] = {}
+
+
+class ImageProxyError(Exception):
+    """Raised when an image can't be proxied."""
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+async def fetch_upstream(url: str) -> bytes:
+    """
+    Download an image from its host, giving up once it exceeds MAX_UPSTREAM_BYTES.
+    Redirects are only followed to ALLOWED_HOSTS.
+    Tests can replace this function with a local stand-in.
+    """
+    async with httpx.AsyncClient(follow_redirects=False) as client:
+        for _ in range(MAX_REDIRECTS + 1):
+            async with client.stream("GET", url, timeout=10.0) as response:
+                if response.is_redirect:
+                    location = response.url.join(response.headers["location"])
+                    if location.scheme not in ("http", "https") or location.host not in ALLOWED_HOSTS:
+                        raise ImageProxyError(f"Upstream redirected to a host that isn't allowed: {location.host}")
+                    url = str(location)
+                    continue
+                return await _read_capped(response)
+        raise ImageProxyError(f"Upstream redirected more than {MAX_REDIRECTS} times")
+
+
+async def _read_capped(response: httpx.Response) -> bytes:
+    """Read a streamed response, giving up once it exceeds MAX_UPSTREAM_BYTES."""
+    response.raise_for_status()
+    content_length = response.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_UPSTREAM_BYTES:
+        raise ImageProxyError(f"Upstream image is larger than {MAX_UPSTREAM_BYTES} bytes")
+
+    data = bytearray()
+    async for chunk in response.aiter_bytes():
+        data.extend(chunk)
+        if len(data) > MAX_UPSTREAM_BYTES:
+            raise ImageProxyError(f"Upstream image is larger than {MAX_UPSTREAM_BYTES} bytes")
+    return bytes(data)
+
+
+def _load_index() -> Dict[Path, int]:
+    """Build the LRU index from the files on disk, oldest access first."""
+    global _cache_index, _cache_bytes
+    if _cache_index is None:
+        files = sorted(IMAGE_CACHE_DIR.glob("*.webp"), key=lambda path: path.stat().st_mtime)
+        _cache_index = {path: path.stat().st_size for path in files}
+        _cache_bytes = sum(_cache_index.values())
+    return _cache_index
+
+
+def _touch(path: Path) -> None:
+    """Mark a cached image as most recently used."""
+    index = _load_index()
+    index[path] = index.pop(path)
+    # Keep the order across restarts
+    os.utime(path)
+
+
+def _read_cached(path: Path) -> Optional[bytes]:
+    """Read a cached image, dropping it from the index if its file has gone missing."""
+    global _cache_bytes
+    index = _load_index()
+    if path not in index:
+        return None
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        _cache_bytes -= index.pop(path)
+        return None
+    _touch(path)
+    return data
+
+
+def _store(path: Path, data: bytes) -> None:
+    """Write an image to the cache and evict the least recently used ones over the limit."""
+    global _cache_bytes
+    index = _load_index()
+    path.write_bytes(data)
+    _cache_bytes += len(data) - index.pop(path, 0)
+    index[path] = len(data)
+
+    while _cache_bytes > IMAGE_CACHE_MAX_BYTES and len(index) > 1:
+        oldest = next(iter(index))
+        _cache_bytes -= index.pop(oldest)
+        oldest.unlink(missing_ok=True)
+
+
+def _cache_path(url: str, size: int) -> Path:
+    url_hash = hashlib.sha256(url.encode()).hexdigest()[:32]
+    return IMAGE_CACHE_DIR / f"{url_hash}_{size}.webp"
+
+
+def _resize_all(data: bytes) -> Dict[int, bytes]:
+    """Center-crop an image to a square and encode it at every size in IMAGE_SIZES."""
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except Exception as e:
+        raise ImageProxyError(f"Upstream returned an invalid image: {e}")
+
+    image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    side = min(image.size)
+    left = (image.width - side) // 2
+    top = (image.height - side) // 2
+    image = image.crop((left, top, left + side, top + side))
+
+    resized = {}
+    for size in IMAGE_SIZES:
+        output = io.BytesIO()
+        image.resize((size, size), Image.LANCZOS).save(output, format="WEBP", quality=85)
+        resized[size] = output.getvalue()
+    return resized
+
+
+def _upstream_url(url: str) -> str:
+    """Twitter's `_normal` avatars are 48px, so fetch the 400px original to resize from."""
+    if urlparse(url).hostname == "pbs.twimg.com":
+        return url.replace("_normal.", "_400x400.")
+    return url
+
+
+async def _fetch_and_resize(url: str) -> Dict[int, bytes]:
+    try:
+        data = await fetch_upstream(_upstream_url(url))
+    except httpx.HTTPError as e:
+        raise ImageProxyError(f"Failed to fetch image: {e}")
+
+    resized = await asyncio.to_thread(_resize_all, data)
+    for size, image_bytes in resized.items():
+        _store(_cache_path(url, size), image_bytes)
+    return resized
+
+
+async def get_image(url: str, size: int) -> Tuple[bytes, str]:
+    """
+    Get a resized profile image, fetching it from its host only on a cache miss.
+
+    Args:
+        url: Original profile image URL
+        size: Square size in pixels, one of IMAGE_SIZES
+
+    Returns:
+        Tuple of the WebP image bytes and their ETag
+
+    Raises:
+        ImageProxyError: If the URL or size isn't allowed, or the image can't be fetched
+    """
+    if size not in IMAGE_SIZES:
+        raise ImageProxyError(f"Size must be one of {', '.join(map(str, IMAGE_SIZES))}", status_code=400)
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or parsed.hostname not in ALLOWED_HOSTS:
+        raise ImageProxyError(f"Images can only be proxied from {', '.join(sorted(ALLOWED_HOSTS))}", status_code=400)
+
+    data = _read_cached(_cache_path(url, size))
+    if data is None:
+        # Every size is produced from one download, shared by concurrent requests
+        if url not in _pending_fetches:
+            _pending_fetches[url] = asyncio.ensure_future(_fetch_and_resize(url))
+        task = _pending_fetches[url]
+        try:
+            data = (await task)[size]
+        finally:
+            if task.done():
+                _pending_fetches.pop(url, None)
+
+    etag = f'"{hashlib.sha1(data).hexdigest()}"'
+    return data, etag
+
+
+def get_stats() -> Dict:
+    """Get the size of the image cache for monitoring."""
+    index = _load_index()
+    return {
+        "images": len(index),
+        "bytes": _cache_bytes,
+        "max_bytes": IMAGE_CACHE_MAX_BYTES
+    }
@@ -0,0 +1,313 @@
+"""
+2D layouts for the Universe graph, computed on the server with NumPy.
+Nodes are placed on concentric rings by degree, and can then be relaxed with a
+force-directed layout whose repulsion is approximated on a grid, so each
+iteration costs O(N * cells) instead of O(N^2).
+"""
+import hashlib
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (cache key, method) -> node ID -> (x, y, ring, links signature) of the last layout computed for it
+_layout_cache: Dict[Tuple[str, str], Dict[str, Tuple[float, float, int, str]]] = {}
+
+
+def _unit_hashes(node_id: str) -> Tuple[float, float]:
+    """Two stable pseudo-random numbers in [0, 1) for a node, so layouts don't reshuffle between calls."""
+    digest = hashlib.blake2b(node_id.encode(), digest_size=8).digest()
+    return (
+        int.from_bytes(digest[:4], "big") / 2 ** 32,
+        int.from_bytes(digest[4:], "big") / 2 ** 32
+    )
+
+
+def ring_layout(node_ids: Sequence[str], rings: Sequence[int]) -> np.ndarray:
+    """
+    Place nodes on concentric rings, innermost ring first.
+
+    Each ring is a band rather than a circle so large rings don't overlap, and
+    a node's angle and offset within its band depend only on its ID.
+
+    Args:
+        node_ids: Node IDs
+        rings: Ring number of each node (1 = innermost, e.g. the friend degree)
+
+    Returns:
+        Array of shape (N, 2) with coordinates in [-1, 1]
+    """
+    if len(node_ids) == 0:
+        return np.zeros((0, 2))
+
+    rings = np.asarray(rings, dtype=np.float64)
+    hashes = np.array([_unit_hashes(node_id) for node_id in node_ids])
+    ring_count = rings.max()
+
+    # Spread each node across 80% of its ring's band
+    radius = (rings - 0.9 + 0.8 * hashes[:, 1]) / ring_count
+    angle = 2 * math.pi * hashes[:, 0]
+    return np.column_stack((radius * np.cos(angle), radius * np.sin(angle)))
+
+
+def _grid_repulsion(positions: np.ndarray, grid_size: int, strength: float) -> np.ndarray:
+    """
+    Approximate the all-pairs repulsion on a grid.
+
+    Each occupied cell acts as one body at the centroid of its nodes. Far-field
+    forces are computed once per pair of cells and shared by every node in a
+    cell; within a cell, each node is pushed away from the centroid of the other
+    nodes in it. That costs O(N + cells^2) per step instead of O(N^2).
+    """
+    low = positions.min(axis=0)
+    span = np.maximum(positions.max(axis=0) - low, 1e-9)
+    cells_xy = np.minimum(((positions - low) / span * grid_size).astype(np.int64), grid_size - 1)
+    cells = cells_xy[:, 0] * grid_size + cells_xy[:, 1]
+
+    # Renumber occupied cells densely
+    occupied, cells = np.unique(cells, return_inverse=True)
+    cells = cells.ravel()
+    masses = np.bincount(cells).astype(np.float64)
+    sums = np.column_stack((
+        np.bincount(cells, weights=positions[:, 0]),
+        np.bincount(cells, weights=positions[:, 1])
+    ))
+    centroids = sums / masses[:, None]
+    softening = (strength * 0.1) ** 2
+
+    # Cell-to-cell forces (the self term is zero because delta is zero)
+    delta = centroids[:, None, :] - centroids[None, :, :]
+    distance_sq = (delta ** 2).sum(axis=2) + softening
+    far_field = strength ** 2 * (delta * (masses / distance_sq)[:, :, None]).sum(axis=1)
+
+    # Each node against the centroid of the other nodes in its own cell
+    others = masses[cells] - 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        others_centroid = (sums[cells] - positions) / others[:, None]
+    local_delta = np.where(others[:, None] > 0, positions - others_centroid, 0.0)
+    local_distance_sq = (local_delta ** 2).sum(axis=1) + softening
+    near_field = strength ** 2 * local_delta * (others / local_distance_sq)[:, None]
+
+    return far_field[cells] + near_field
+
+
+def force_layout(
+    positions: np.ndarray,
+    edges: np.ndarray,
+    weights: Optional[np.ndarray] = None,
+    movable: Optional[np.ndarray] = None,
+    iterations: int = 100,
+    target_radius: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Relax a layout with a force-directed (Fruchterman-Reingold style) simulation.
+
+    Args:
+        positions: Starting coordinates, shape (N, 2)
+        edges: Pairs of node indices, shape (E, 2)
+        weights: Strength of each edge (defaults to 1)
+        movable: Boolean mask of nodes allowed to move (defaults to all)
+        iterations: Number of simulation steps
+        target_radius: Optional radius per node to pull it back to its ring
+
+    Returns:
+        New coordinates, shape (N, 2)
+    """
+    positions = np.array(positions, dtype=np.float64)
+    node_count = len(positions)
+    if node_count < 2 or iterations <= 0:
+        return positions
+
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    weights = np.ones(len(edges)) if weights is None else np.asarray(weights, dtype=np.float64)
+    if len(weights):
+        weights = weights / weights.max()
+    movable = np.ones(node_count, dtype=bool) if movable is None else np.asarray(movable, dtype=bool)
+
+    # Ideal distance between nodes when the graph fills the unit disc
+    spacing = 1.0 / math.sqrt(node_count)
+    grid_size = int(min(16, max(4, math.sqrt(node_count) / 2)))
+    temperature = 0.1
+
+    for step in range(iterations):
+        forces = _grid_repulsion(positions, grid_size, spacing)
+
+        if len(edges):
+            delta = positions[edges[:, 1]] - positions[edges[:, 0]]
+            distance = np.sqrt((delta ** 2).sum(axis=1, keepdims=True)) + 1e-9
+            pull = delta * distance * weights[:, None] / spacing
+            for axis in (0, 1):
+                forces[:, axis] += np.bincount(edges[:, 0], weights=pull[:, axis], minlength=node_count)
+                forces[:, axis] -= np.bincount(edges[:, 1], weights=pull[:, axis], minlength=node_count)
+
+        if target_radius is not None:
+            radius = np.sqrt((positions ** 2).sum(axis=1, keepdims=True)) + 1e-9
+            forces += (target_radius[:, None] - radius) * positions / radius / spacing
+
+        # Limit each move to the current temperature, which cools linearly
+        length = np.sqrt((forces ** 2).sum(axis=1, keepdims=True)) + 1e-9
+        step_size = temperature * (1 - step / iterations)
+        moves = forces / length * np.minimum(length, step_size)
+        positions[movable] += moves[movable]
+
+    return positions
+
+
+def fit_to_unit(positions: np.ndarray) -> np.ndarray:
+    """Center a layout and scale it to fit in [-1, 1]."""
+    if len(positions) == 0:
+        return positions
+    centered = positions - positions.mean(axis=0)
+    extent = np.abs(centered).max()
+    return centered / extent if extent > 0 else centered
+
+
+def compute_layout(
+    node_ids: List[str],
+    rings: Sequence[int],
+    edges: Optional[List[Tuple[str, str, float]]] = None,
+    method: str = "force",
+    previous: Optional[Dict[str, Tuple[float, float]]] = None,
+    iterations: int = 100,
+    incremental_iterations: int = 30
+) -> Dict[str, List]:
+    """
+    Compute a layout, reusing a previous one when only new nodes were added.
+
+    Nodes that already have a position in `previous` stay where they are; only
+    new nodes are placed (on their ring) and relaxed, so adding a handful of
+    nodes to a large graph is cheap and does not move the rest of it.
+
+    Args:
+        node_ids: Node IDs
+        rings: Ring number of each node (1 = innermost)
+        edges: (source ID, target ID, weight) links between nodes
+        method: "ring" for the degree-ring layout only, "force" to relax it with forces
+        previous: Node ID -> (x, y) from an earlier layout
+        iterations: Simulation steps for a full layout
+        incremental_iterations: Simulation steps when extending a previous layout
+
+    Returns:
+        Compact layout with parallel "ids", "x", "y" and "ring" lists
+    """
+    if method not in ("ring", "force"):
+        raise ValueError(f"Unknown layout method '{method}'")
+
+    positions = ring_layout(node_ids, rings)
+    movable = np.ones(len(node_ids), dtype=bool)
+    if previous:
+        for index, node_id in enumerate(node_ids):
+            if node_id in previous:
+                positions[index] = previous[node_id]
+                movable[index] = False
+
+    if method == "force" and movable.any():
+        index_of = {node_id: index for index, node_id in enumerate(node_ids)}
+        edge_list = [
+            (index_of[source], index_of[target], weight)
+            for source, target, weight in (edges or [])
+            if source in index_of and target in index_of
+        ]
+        edge_array = np.array([edge[:2] for edge in edge_list], dtype=np.int64).reshape(-1, 2)
+        weight_array = np.array([edge[2] for edge in edge_list], dtype=np.float64)
+        ring_array = np.asarray(rings, dtype=np.float64)
+        target_radius = (ring_array - 0.5) / ring_array.max() if len(ring_array) else None
+
+        full_layout = movable.all()
+        positions = force_layout(
+            positions,
+            edge_array,
+            weight_array,
+            movable=movable,
+            iterations=iterations if full_layout else incremental_iterations,
+            target_radius=target_radius
+        )
+        if full_layout:
+            positions = fit_to_unit(positions)
+
+    return {
+        "ids": list(node_ids),
+        "x": np.round(positions[:, 0], 4).tolist(),
+        "y": np.round(positions[:, 1], 4).tolist(),
+        "ring": [int(ring) for ring in rings]
+    }
+
+
+def _link_signatures(node_ids: Sequence[str], edges: List[Tuple[str, str, float]]) -> Dict[str, str]:
+    """Fingerprint each node's links, so a node whose links changed can be moved again."""
+    links: Dict[str, List[Tuple[str, float]]] = {}
+    for source, target, weight in edges:
+        links.setdefault(source, []).append((target, weight))
+        links.setdefault(target, []).append((source, weight))
+    return {
+        node_id: hashlib.blake2b(repr(sorted(links.get(node_id, ()))).encode(), digest_size=8).hexdigest()
+        for node_id in node_ids
+    }
+
+
+def get_cached_layout(cache_key: str, node_ids: List[str], method: str = "force") -> Optional[Dict[str, List]]:
+    """
+    Get the cached layout of a graph without its rings or edges, for callers
+    that know the graph hasn't changed since it was laid out.
+
+    Returns:
+        Compact layout, or None if any node has never been laid out
+    """
+    cached = _layout_cache.get((cache_key, method), {})
+    if not all(node_id in cached for node_id in node_ids):
+        return None
+    return {
+        "ids": list(node_ids),
+        "x": [cached[node_id][0] for node_id in node_ids],
+        "y": [cached[node_id][1] for node_id in node_ids],
+        "ring": [cached[node_id][2] for node_id in node_ids]
+    }
+
+
+def get_layout(
+    cache_key: str,
+    node_ids: List[str],
+    rings: Sequence[int],
+    edges: Optional[List[Tuple[str, str, float]]] = None,
+    method: str = "force"
+) -> Dict[str, List]:
+    """
+    Get the layout of a graph, computing only what changed since the last call.
+    Nodes that are new, moved to another ring or whose links changed are placed
+    again; everything else keeps its cached position.
+
+    Args:
+        cache_key: Name of the graph (layouts of the same graph extend each other)
+        node_ids: Node IDs
+        rings: Ring number of each node (1 = innermost)
+        edges: (source ID, target ID, weight) links between nodes
+        method: "ring" or "force"
+
+    Returns:
+        Compact layout with parallel "ids", "x", "y" and "ring" lists
+    """
+    cached = _layout_cache.get((cache_key, method), {})
+    signatures = _link_signatures(node_ids, edges or [])
+    previous = {
+        node_id: cached[node_id][:2]
+        for node_id, ring in zip(node_ids, rings)
+        if node_id in cached and cached[node_id][2:] == (int(ring), signatures[node_id])
+    }
+    if len(previous) == len(node_ids):
+        # Nothing changed, serve the cached positions
+        return {
+            "ids": list(node_ids),
+            "x": [previous[node_id][0] for node_id in node_ids],
+            "y": [previous[node_id][1] for node_id in node_ids],
+            "ring": [int(ring) for ring in rings]
+        }
+
+    layout = compute_layout(node_ids, rings, edges, method=method, previous=previous)
+    _layout_cache[(cache_key, method)] = {
+        **cached,
+        **{
+            node_id: (x, y, ring, signatures[node_id])
+            for node_id, x, y, ring in zip(layout["ids"], layout["x"], layout["y"], layout["ring"])
+        }
+    }
+    return layout
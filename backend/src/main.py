@@ -10,33 +10,40 @@ When used, the application bundle from building the React app with `npm run buil
 is placed at the public directory defined below for FastAPI to serve as static assets.
 That means any requests for existing files will be served the contents of those files,
 and any requests for the API paths will be sent to the API routes defined in the API.
+
+Static files are served with their precompressed `.br`/`.gz` variants when the browser
+accepts them (see `frontend/scripts/precompress.js`), and large API responses are gzipped.
 """
 
 from pathlib import Path
 
 from fastapi import FastAPI, Request, status
 from fastapi.exceptions import HTTPException
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response
+from starlette.middleware.gzip import GZipMiddleware
 
 import api
+from static_assets import PrecompressedStaticFiles, cached_html_response
 
 PUBLIC_DIRECTORY = Path("public")
+# API responses smaller than this are sent uncompressed
+API_GZIP_MINIMUM_SIZE = 1024
 
 # Create a main app under which the API will be mounted as a sub-app
-app = FastAPI()
+# Sub-apps don't receive lifespan events, so the API's shutdown hook runs here
+app = FastAPI(lifespan=api.lifespan)
 
-# Send all requests to paths under `/api/*` to the API router
-app.mount("/api/", api.app)
+# Send all requests to paths under `/api/*` to the API router, gzipping large responses
+app.mount("/api/", GZipMiddleware(api.app, minimum_size=API_GZIP_MINIMUM_SIZE))
 
 
 # Make the public files (HTML, JS, CSS, etc.) accessible on the server
 # With HTML mode, `index.html` is automatically loaded
-app.mount("/", StaticFiles(directory=PUBLIC_DIRECTORY, html=True), name="public")
+app.mount("/", PrecompressedStaticFiles(directory=PUBLIC_DIRECTORY, html=True), name="public")
 
 
 @app.exception_handler(status.HTTP_404_NOT_FOUND)
-async def not_found(req: Request, exc: HTTPException) -> FileResponse:
+async def not_found(req: Request, exc: HTTPException) -> Response:
     """
     Serve the frontend app for all other requests not directed to `/api/` or `/`.
 
@@ -45,5 +52,6 @@ async def not_found(req: Request, exc: HTTPException) -> FileResponse:
     navigating directly to a virtual path.
 
     This should be removed if the frontend app does not handle different URL paths.
+    `index.html` is kept in memory so the fallback doesn't read it from disk every time.
     """
-    return FileResponse(PUBLIC_DIRECTORY / "index.html")
+    return cached_html_response(PUBLIC_DIRECTORY / "index.html", req)
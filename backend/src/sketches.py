@@ -0,0 +1,101 @@
+"""
+Fixed-size MinHash sketches of following sets.
+A sketch keeps the k smallest 64-bit hashes of a set (a bottom-k MinHash), which
+is enough to estimate Jaccard similarity and overlap size between any number of
+sets without looking at the full ID lists again.
+"""
+import hashlib
+import math
+from typing import Dict, Iterable, List
+
+# Number of hashes kept per sketch. Standard error of the Jaccard estimate is
+# about sqrt(J * (1 - J) / SKETCH_SIZE), i.e. at most ~0.044 for 128.
+SKETCH_SIZE = 128
+
+_HASH_SPACE = 2 ** 64
+
+
+def _hash_id(user_id: str) -> int:
+    """Hash a user ID to a uniformly distributed 64-bit integer."""
+    return int.from_bytes(hashlib.blake2b(user_id.encode(), digest_size=8).digest(), "big")
+
+
+def compute_sketch(user_ids: Iterable[str], k: int = SKETCH_SIZE) -> Dict:
+    """
+    Compute the bottom-k MinHash sketch of a set of user IDs.
+
+    Args:
+        user_ids: IDs in the set (duplicates are ignored)
+        k: Number of hashes to keep
+
+    Returns:
+        Dictionary with the sketch size k, the exact set size and the sorted hashes
+    """
+    hashes = {_hash_id(user_id) for user_id in user_ids}
+    return {
+        "k": k,
+        "size": len(hashes),
+        "hashes": sorted(hashes)[:k]
+    }
+
+
+def estimate_overlap(sketches: List[Dict]) -> Dict:
+    """
+    Estimate the similarity and overlap of two or more sets from their sketches.
+
+    Small sets (fewer than k elements) are stored in full, so estimates between
+    them are exact. Error bounds are 95% intervals.
+
+    Args:
+        sketches: Sketches from compute_sketch
+
+    Returns:
+        Dictionary with the Jaccard similarity, the overlap count and their error bounds
+    """
+    if len(sketches) < 2:
+        raise ValueError("At least two sketches are needed to estimate overlap")
+
+    k = min(sketch["k"] for sketch in sketches)
+    hash_sets = [set(sketch["hashes"][:k]) for sketch in sketches]
+
+    # Bottom-k of the union; any of its hashes that belongs to a set is also in that set's sketch
+    union_sketch = sorted(set().union(*hash_sets))[:k]
+    if not union_sketch:
+        return {
+            "jaccard": 0.0,
+            "jaccard_error": 0.0,
+            "overlap": 0,
+            "overlap_error": 0,
+            "union_size": 0,
+            "exact": True
+        }
+
+    shared = sum(1 for value in union_sketch if all(value in hashes for hashes in hash_sets))
+    jaccard = shared / len(union_sketch)
+
+    # With fewer than k hashes in the union, every element was kept and the counts are exact
+    exact = len(union_sketch) < k
+    if exact:
+        union_size = len(union_sketch)
+        jaccard_error = 0.0
+    else:
+        if len(sketches) == 2:
+            # Both set sizes are known exactly, so |A u B| = (|A| + |B|) / (1 + J)
+            union_size = (sketches[0]["size"] + sketches[1]["size"]) / (1 + jaccard)
+        else:
+            union_size = (k - 1) * _HASH_SPACE / (union_sketch[-1] + 1)
+            # Never estimate a union smaller than the largest known set
+            union_size = max(union_size, max(sketch["size"] for sketch in sketches))
+        jaccard_error = 1.96 * math.sqrt(jaccard * (1 - jaccard) / k)
+
+    overlap = jaccard * union_size
+    overlap = min(overlap, min(sketch["size"] for sketch in sketches))
+
+    return {
+        "jaccard": round(jaccard, 4),
+        "jaccard_error": round(jaccard_error, 4),
+        "overlap": round(overlap),
+        "overlap_error": math.ceil(jaccard_error * union_size),
+        "union_size": round(union_size),
+        "exact": exact
+    }
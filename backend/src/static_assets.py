@@ -0,0 +1,126 @@
+"""
+Static file serving for the built React app.
+Serves precompressed `.br`/`.gz` variants of files when the browser accepts them,
+marks Vite's fingerprinted assets as immutable, and keeps `index.html` in memory
+for the single-page app fallback.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.types import Scope
+
+# Vite puts every fingerprinted (content-hashed) file under this directory
+ASSETS_DIRECTORY = "assets"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Everything else (index.html, favicon, ...) must be revalidated so deploys show up
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Precompressed variants in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves `<file>.br` or `<file>.gz` next to `<file>` when the client accepts it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Full path -> encoding -> (variant path, stat); deployed files don't change while running
+        self._variants: Dict[str, Dict[str, Tuple[str, os.stat_result]]] = {}
+
+    def _find_variants(self, full_path: str) -> Dict[str, Tuple[str, os.stat_result]]:
+        if full_path not in self._variants:
+            variants = {}
+            for encoding, suffix in ENCODINGS:
+                try:
+                    variants[encoding] = (full_path + suffix, os.stat(full_path + suffix))
+                except OSError:
+                    continue
+            self._variants[full_path] = variants
+        return self._variants[full_path]
+
+    def _cache_control(self, full_path: str) -> str:
+        try:
+            relative_parts = Path(full_path).relative_to(Path(self.directory).resolve()).parts
+        except ValueError:
+            relative_parts = ()
+        if relative_parts and relative_parts[0] == ASSETS_DIRECTORY:
+            return IMMUTABLE_CACHE_CONTROL
+        return REVALIDATE_CACHE_CONTROL
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        accept_encoding = request_headers.get("accept-encoding", "")
+        full_path = str(full_path)
+        variants = self._find_variants(full_path)
+
+        response = None
+        for encoding, _ in ENCODINGS:
+            if encoding in variants and encoding in accept_encoding:
+                variant_path, variant_stat = variants[encoding]
+                # Keep the original file's content type, not that of .br/.gz
+                media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+                response = FileResponse(
+                    variant_path,
+                    status_code=status_code,
+                    stat_result=variant_stat,
+                    media_type=media_type
+                )
+                response.headers["Content-Encoding"] = encoding
+                break
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        if variants:
+            response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = self._cache_control(full_path)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return Response(status_code=304, headers={
+                key: value for key, value in response.headers.items()
+                if key.lower() in ("cache-control", "etag", "vary")
+            })
+        return response
+
+
+# Path -> (raw bytes, gzipped bytes, ETag) of HTML files kept in memory
+_html_cache: Dict[Path, Tuple[bytes, bytes, str]] = {}
+
+
+def cached_html_response(path: Path, request: Request, status_code: int = 200) -> Response:
+    """
+    Serve an HTML file from memory, gzipped when the client accepts it.
+    The file is read and compressed once, on first use.
+
+    Args:
+        path: HTML file (e.g. the app's index.html)
+        request: Incoming request
+        status_code: Status code of the response
+    """
+    if path not in _html_cache:
+        content = path.read_bytes()
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+        _html_cache[path] = (content, gzip.compress(content), etag)
+    content, gzipped, etag = _html_cache[path]
+
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        content = gzipped
+    return Response(content=content, status_code=status_code, media_type="text/html", headers=headers)
+
@@ -0,0 +1,198 @@
+"""
+Adaptive cache TTLs per cached entity.
+Every time an entity is re-fetched, a hash of its content is compared with the
+previous one. Entities that keep coming back unchanged get longer TTLs, and ones
+that change get shorter TTLs, within bounds configured per entity type.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+# Entity type (cache key prefix) -> (minimum, maximum) TTL
+DEFAULT_TTL_BOUNDS: Dict[str, Tuple[timedelta, timedelta]] = {
+    "profile": (timedelta(hours=1), timedelta(days=7)),     # Profiles: bios and counts drift slowly
+    "following": (timedelta(hours=1), timedelta(days=7)),   # Following lists
+    "users": (timedelta(hours=1), timedelta(days=7)),       # Hydrated batches of mutuals
+    "mutuals": (timedelta(minutes=30), timedelta(days=3)),  # Mutual results depend on two lists
+}
+# Applied to a TTL after a refresh that didn't / did change the data
+GROWTH_FACTOR = 1.5
+SHRINK_FACTOR = 0.5
+# Append changed entities to the journal at most this often (seconds)
+PERSIST_INTERVAL = 10.0
+# The journal is folded into the policy file once it has more entries than this,
+# or than there are entities, so rewriting every entity stays rare
+COMPACT_MIN_ENTRIES = 1000
+
+
+def _entity_type(key: str) -> str:
+    return key.split("_", 1)[0]
+
+
+def _canonical(data):
+    """Order lists of users by ID, since the same users can come back in any order."""
+    if isinstance(data, list) and data and all(isinstance(item, dict) and "id" in item for item in data):
+        return sorted(data, key=lambda item: str(item["id"]))
+    return data
+
+
+def content_hash(data) -> str:
+    """Hash cached data independently of key order, the order of listed users, and formatting."""
+    return hashlib.sha256(json.dumps(_canonical(data), sort_keys=True).encode()).hexdigest()
+
+
+class TTLPolicy:
+    """Tracks how often each cached entity changes and picks its TTL accordingly."""
+
+    def __init__(
+        self,
+        path: Path,
+        default_ttl: timedelta,
+        bounds: Dict[str, Tuple[timedelta, timedelta]] = DEFAULT_TTL_BOUNDS
+    ):
+        """
+        Args:
+            path: JSON file the per-entity state is persisted to; changes since
+                it was written are appended to a journal next to it
+            default_ttl: TTL of entities that haven't been refreshed yet, and of untracked types
+            bounds: Entity type -> (minimum, maximum) TTL
+        """
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix(".journal")
+        self.default_ttl = default_ttl.total_seconds()
+        self.bounds = {
+            entity_type: (low.total_seconds(), high.total_seconds())
+            for entity_type, (low, high) in bounds.items()
+        }
+        # Cache key -> {"ttl", "hash", "refreshes", "changes"}
+        self._entities: Dict[str, Dict] = {}
+        # Entity type -> counters since start
+        self._stats: Dict[str, Dict[str, int]] = {}
+        # Keys changed since the last journal write, and entries already in the journal
+        self._pending: Set[str] = set()
+        self._journal_entries = 0
+        self._persisted_at = 0.0
+
+        try:
+            with open(self.path, "r") as f:
+                self._entities = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self._entities = {}
+
+        # Journal lines are [key, entity]; later lines for a key replace earlier ones
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        key, entity = json.loads(line)
+                    except (json.JSONDecodeError, ValueError):
+                        # A write cut short by a crash
+                        continue
+                    self._entities[key] = entity
+                    self._journal_entries += 1
+        except OSError:
+            pass
+
+    def _type_stats(self, key: str) -> Dict[str, int]:
+        return self._stats.setdefault(_entity_type(key), {
+            "hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "unchanged_refreshes": 0
+        })
+
+    def tracks(self, key: str) -> bool:
+        """Whether the entity's type has adaptive TTLs (derived data like sketches doesn't)."""
+        return _entity_type(key) in self.bounds
+
+    def ttl(self, key: str) -> timedelta:
+        """Get the current TTL of a cached entity."""
+        entity = self._entities.get(key)
+        return timedelta(seconds=entity["ttl"] if entity else self.default_ttl)
+
+    def record_lookup(self, key: str, hit: bool) -> None:
+        """Count a cache lookup; a hit is an upstream call saved."""
+        if not self.tracks(key):
+            return
+        self._type_stats(key)["hits" if hit else "misses"] += 1
+
+    def record_store(self, key: str, data) -> None:
+        """
+        Update an entity's TTL when it is (re)written to the cache.
+        An unchanged refresh means the TTL was too short; a change means it may be too long.
+        """
+        if not self.tracks(key):
+            return
+        new_hash = content_hash(data)
+        entity = self._entities.get(key)
+        if entity is None:
+            self._entities[key] = {"ttl": self.default_ttl, "hash": new_hash, "refreshes": 0, "changes": 0}
+        else:
+            low, high = self.bounds[_entity_type(key)]
+            changed = entity["hash"] != new_hash
+            factor = SHRINK_FACTOR if changed else GROWTH_FACTOR
+            entity["ttl"] = min(high, max(low, entity["ttl"] * factor))
+            entity["hash"] = new_hash
+            entity["refreshes"] += 1
+            entity["changes"] += int(changed)
+
+            type_stats = self._type_stats(key)
+            type_stats["refreshes"] += 1
+            type_stats["unchanged_refreshes"] += int(not changed)
+
+        self._pending.add(key)
+        self.persist()
+
+    def persist(self, force: bool = False) -> None:
+        """Append the entities changed since the last write to the journal, at most every PERSIST_INTERVAL seconds."""
+        if not self._pending or (not force and time.monotonic() - self._persisted_at < PERSIST_INTERVAL):
+            return
+        with open(self.journal_path, "a") as f:
+            f.write("".join(json.dumps([key, self._entities[key]]) + "\n" for key in self._pending))
+        self._journal_entries += len(self._pending)
+        self._pending = set()
+        self._persisted_at = time.monotonic()
+
+        if self._journal_entries > max(COMPACT_MIN_ENTRIES, len(self._entities)):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the policy file from memory and empty the journal."""
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(self._entities, f)
+        temp_path.replace(self.path)
+        # Replaying entries that are already in the policy file is harmless, so
+        # a crash between these two steps loses nothing
+        self.journal_path.unlink(missing_ok=True)
+        self._journal_entries = 0
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Report TTLs and cache effectiveness per entity type.
+
+        `upstream_calls_saved` counts cache hits; `unchanged_refreshes` counts
+        refreshes that downloaded data identical to what was cached.
+        """
+        ttls: Dict[str, list] = {}
+        for key, entity in self._entities.items():
+            ttls.setdefault(_entity_type(key), []).append(entity["ttl"])
+
+        report = {}
+        for entity_type in sorted(set(ttls) | set(self._stats)):
+            type_stats = self._stats.get(entity_type, {})
+            hits = type_stats.get("hits", 0)
+            lookups = hits + type_stats.get("misses", 0)
+            type_ttls = ttls.get(entity_type, [])
+            report[entity_type] = {
+                "entities": len(type_ttls),
+                "mean_ttl_hours": round(sum(type_ttls) / len(type_ttls) / 3600, 2) if type_ttls else None,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+                "upstream_calls_saved": hits,
+                "refreshes": type_stats.get("refreshes", 0),
+                "unchanged_refreshes": type_stats.get("unchanged_refreshes", 0)
+            }
+        return report
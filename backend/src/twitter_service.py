@@ -6,12 +6,26 @@ Includes caching for demo purposes and rate limit handling.
 import os
 import asyncio
 import json
+import math
+import re
+import time
 from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import httpx
+import numpy as np
 from dotenv import load_dotenv
 
+import cohort
+import layout
+from circuit_breaker import CircuitBreaker
+from credential_pool import CredentialPool
+from follower_index import FollowerIndex
+from graph_snapshot import export_snapshot, load_snapshot
+from identity_index import IdentityIndex
+from sketches import compute_sketch, estimate_overlap
+from ttl_policy import TTLPolicy
+
 # Load environment variables from backend/.env
 backend_dir = Path(__file__).parent.parent
 env_path = backend_dir / ".env"
@@ -19,14 +33,65 @@ load_dotenv(dotenv_path=env_path)
 
 TWITTER_API_BASE = "https://api.twitter.com/2"
 BEARER_TOKEN = os.getenv("TWITTER_BEARER_TOKEN")
+# Optional comma-separated list of extra tokens; each one adds its own rate limit budget
+BEARER_TOKENS = [
+    token.strip()
+    for token in [BEARER_TOKEN or "", *os.getenv("TWITTER_BEARER_TOKENS", "").split(",")]
+    if token.strip()
+]
 
-if not BEARER_TOKEN:
+if not BEARER_TOKENS:
     raise ValueError("TWITTER_BEARER_TOKEN not found in environment variables")
 
+CREDENTIAL_POOL = CredentialPool(BEARER_TOKENS)
+# Fail fast while api.twitter.com keeps erroring instead of piling up doomed requests
+CIRCUIT_BREAKER = CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+REQUEST_TIMEOUT = 30.0  # Seconds per upstream attempt when no deadline is tighter
+# What each rate limit bucket is spent on, for error messages
+BUCKET_DESCRIPTIONS = {
+    "following": "following lists (15 requests per 15 minutes on the free tier)",
+    "users": "user lookups by ID",
+    "users_by": "bulk username lookups",
+    "users_by_username": "username lookups"
+}
+
 # Cache directory for demo data
 CACHE_DIR = backend_dir / "cache"
 CACHE_DIR.mkdir(exist_ok=True)
 CACHE_DURATION = timedelta(hours=24)  # Cache for 24 hours for demo purposes
+# Per-entity TTLs that start at CACHE_DURATION and adapt to how often each entity changes
+TTL_POLICY = TTLPolicy(CACHE_DIR / "ttl_policy.json", default_ttl=CACHE_DURATION)
+# Username <-> ID index; profiles are cached as profile_{id}, handles that don't exist for a short while
+NEGATIVE_CACHE_DURATION = timedelta(minutes=10)
+IDENTITY_INDEX = IdentityIndex(CACHE_DIR / "identity_index.json", negative_ttl=NEGATIVE_CACHE_DURATION)
+# Twitter handles are 1-15 letters, digits or underscores; one bad handle fails a whole /users/by batch
+USERNAME_PATTERN = re.compile(r"[A-Za-z0-9_]{1,15}")
+
+# In-memory copy of the MinHash sketch of every following set we have fetched
+_following_sketches: Dict[str, Dict] = {}
+# In-memory int64 copies of cached following lists, so cohort queries skip re-parsing IDs
+_following_arrays: Dict[str, np.ndarray] = {}
+
+# Memory-mapped CSR snapshot of all cached following lists (see graph_snapshot.py)
+GRAPH_SNAPSHOT_PATH = CACHE_DIR / "following_graph.csr"
+GRAPH_SNAPSHOT = load_snapshot(GRAPH_SNAPSHOT_PATH)
+# User ID -> when their following list was last written to the JSON cache (or
+# fetched), seeded from file modification times on first use. A snapshot row
+# older than this was superseded by a later fetch, also across restarts
+_following_written_at: Optional[Dict[str, float]] = None
+# Snapshot rows keep cached_at in whole seconds, and the JSON file they were
+# exported from was written just after that, so allow for both
+SNAPSHOT_CLOCK_SLACK = 2.0
+# Bumped whenever a following list is (re)fetched or the snapshot reloaded, so
+# layouts computed from the cached lists know when they're out of date
+_following_version = 0
+# (layout cache key, method) -> _following_version the cached layout was computed at
+_layout_versions: Dict[tuple, int] = {}
+# Followee -> crawled followers index over every cached following list, built on first use
+_follower_index: Optional[FollowerIndex] = None
+# Build of the follower index running in a worker thread, and the lists fetched meanwhile
+_follower_index_build: Optional[asyncio.Future] = None
+_pending_index_updates: List[tuple] = []
 
 
 class TwitterAPIError(Exception):
@@ -41,15 +106,45 @@ class RateLimitError(TwitterAPIError):
         self.retry_after = retry_after
 
 
+class DeadlineExceededError(TwitterAPIError):
+    """Raised when a request runs out of time; carries whatever was fetched so far."""
+    def __init__(self, message: str, partial_result: Optional[List] = None):
+        super().__init__(message)
+        self.partial_result = partial_result
+
+
+class CircuitOpenError(TwitterAPIError):
+    """Raised without calling Twitter while the API is failing."""
+    def __init__(self, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def flush_state() -> None:
+    """Write out state whose persistence is throttled, e.g. on shutdown."""
+    TTL_POLICY.persist(force=True)
+    IDENTITY_INDEX.persist(force=True)
+
+
 def _get_cache_path(key: str) -> Path:
     """Get cache file path for a given key."""
     return CACHE_DIR / f"{key}.json"
 
 
-def _load_from_cache(key: str) -> Optional[Dict]:
-    """Load data from cache if it exists and is still valid."""
+def _load_from_cache(key: str, allow_stale: bool = False, record: bool = True) -> Optional[Dict]:
+    """
+    Load data from cache if it exists and is still valid.
+    
+    Args:
+        key: Cache key
+        allow_stale: Also return entries older than their TTL
+        record: Count the lookup in the TTL policy's stats (off for lookups
+            that only check what is cached, like the query planner's)
+    """
     cache_path = _get_cache_path(key)
     if not cache_path.exists():
+        if record and not allow_stale:
+            TTL_POLICY.record_lookup(key, hit=False)
         return None
     
     try:
@@ -57,11 +152,15 @@ def _load_from_cache(key: str) -> Optional[Dict]:
             cached_data = json.load(f)
             cached_time = datetime.fromisoformat(cached_data.get("cached_at", "2000-01-01"))
             
-            if datetime.now() - cached_time < CACHE_DURATION:
+            if allow_stale:
+                return cached_data.get("data")
+            fresh = datetime.now() - cached_time < TTL_POLICY.ttl(key)
+            if record:
+                TTL_POLICY.record_lookup(key, hit=fresh)
+            if fresh:
                 return cached_data.get("data")
             else:
-                # Cache expired, delete file
-                cache_path.unlink()
+                # Cache expired, keep the file so it can still serve as a stale fallback
                 return None
     except (json.JSONDecodeError, KeyError, ValueError):
         # Invalid cache file, delete it
@@ -70,7 +169,8 @@ def _load_from_cache(key: str) -> Optional[Dict]:
 
 
 def _save_to_cache(key: str, data: Dict) -> None:
-    """Save data to cache."""
+    """Save data to cache, and let the TTL policy see whether it changed since last time."""
+    TTL_POLICY.record_store(key, data)
     cache_path = _get_cache_path(key)
     cache_data = {
         "cached_at": datetime.now().isoformat(),
@@ -80,70 +180,326 @@ def _save_to_cache(key: str, data: Dict) -> None:
         json.dump(cache_data, f, indent=2)
 
 
+def _get_following_written_at() -> Dict[str, float]:
+    """Get when each user's following list was last written, scanning the cache directory on first use."""
+    global _following_written_at
+    if _following_written_at is None:
+        written_at: Dict[str, float] = {}
+        with os.scandir(CACHE_DIR) as entries:
+            for entry in entries:
+                if entry.name.startswith("following_") and entry.name.endswith(".json"):
+                    user_id = entry.name.split("_")[1]
+                    written_at[user_id] = max(written_at.get(user_id, 0.0), entry.stat().st_mtime)
+        _following_written_at = written_at
+    return _following_written_at
+
+
+def _snapshot_row(user_id: str) -> Optional[tuple]:
+    """
+    Look up a user's (following, cached_at, limit) row in the graph snapshot,
+    or None if they aren't in it or their list was fetched again since it was exported.
+    """
+    if GRAPH_SNAPSHOT is None:
+        return None
+    entry = GRAPH_SNAPSHOT.following(user_id)
+    if entry is None or _get_following_written_at().get(user_id, 0.0) > entry[1] + SNAPSHOT_CLOCK_SLACK:
+        return None
+    return entry
+
+
+def _snapshot_following(
+    user_id: str,
+    max_results: int,
+    allow_stale: bool = False,
+    record: bool = True
+) -> Optional[np.ndarray]:
+    """
+    Look up a following list in the graph snapshot, without parsing anything.
+    
+    Returns:
+        Sorted int64 IDs, or None if the snapshot can't stand in for a
+        following list fetched with max_results
+    """
+    return _matching_following(user_id, _snapshot_row(user_id), max_results, allow_stale, record)
+
+
+def _matching_following(
+    user_id: str,
+    entry: Optional[tuple],
+    max_results: int,
+    allow_stale: bool = False,
+    record: bool = True
+) -> Optional[np.ndarray]:
+    """
+    Check whether a (following, cached_at, limit) entry from the graph snapshot
+    or the follower index can stand in for a list fetched with max_results.
+    A match is counted as a cache hit when `record` is set.
+    """
+    if entry is None:
+        return None
+    
+    following, cached_at, limit = entry
+    if not allow_stale:
+        ttl = TTL_POLICY.ttl(f"following_{user_id}_{limit}")
+        if datetime.now().timestamp() - cached_at >= ttl.total_seconds():
+            # The caller falls back to the JSON cache, which counts the miss
+            return None
+    # A list fetched with the same limit, or one that was complete, matches what Twitter would return
+    complete = len(following) < limit
+    if limit == max_results or (complete and len(following) <= max_results):
+        if record and not allow_stale:
+            TTL_POLICY.record_lookup("following", hit=True)
+        return following
+    return None
+
+
+def _load_following_from_cache(
+    user_id: str,
+    max_results: int,
+    allow_stale: bool = False,
+    record: bool = True
+) -> Optional[List[str]]:
+    """Load a cached following list from the graph snapshot or the JSON cache."""
+    snapshot_following = _snapshot_following(user_id, max_results, allow_stale=allow_stale, record=record)
+    if snapshot_following is not None:
+        return [str(followed_id) for followed_id in snapshot_following.tolist()]
+    return _load_from_cache(f"following_{user_id}_{max_results}", allow_stale=allow_stale, record=record)
+
+
+def _build_follower_index() -> FollowerIndex:
+    """Index the JSON cached lists the graph snapshot doesn't have, on top of the snapshot."""
+    index = FollowerIndex(GRAPH_SNAPSHOT)
+    for cache_path in CACHE_DIR.glob("following_*_*.json"):
+        _, user_id, limit = cache_path.stem.split("_")
+        entry = _snapshot_row(user_id)
+        if entry is not None and entry[2] >= int(limit):
+            # Already in the snapshot
+            continue
+        try:
+            with open(cache_path, "r") as f:
+                cached_data = json.load(f)
+            cached_at = datetime.fromisoformat(cached_data["cached_at"]).timestamp()
+        except (json.JSONDecodeError, KeyError, ValueError, OSError):
+            continue
+        if cached_data.get("data"):
+            index.update(user_id, cached_data["data"], cached_at, int(limit))
+    return index
+
+
+async def _get_follower_index() -> FollowerIndex:
+    """
+    Get the follower index, building it in a worker thread on first use so
+    parsing the cached lists doesn't block the event loop. Afterwards
+    get_user_following_ids keeps it up to date.
+    """
+    global _follower_index, _follower_index_build
+    while _follower_index is None:
+        if _follower_index_build is None:
+            _follower_index_build = asyncio.ensure_future(asyncio.to_thread(_build_follower_index))
+        build = _follower_index_build
+        index = await build
+        if _follower_index is None and _follower_index_build is build:
+            # Lists fetched while the build was reading the cache
+            for update in _pending_index_updates:
+                index.update(*update)
+            _pending_index_updates.clear()
+            _follower_index = index
+            _follower_index_build = None
+    return _follower_index
+
+
+async def get_crawled_followers(user_id: str) -> List[str]:
+    """
+    Get the IDs of the crawled users that follow a user, without calling Twitter.
+    Any two of them share the user as a mutual.
+    
+    Args:
+        user_id: Twitter user ID
+    """
+    return (await _get_follower_index()).followers(user_id)
+
+
+def refresh_graph_snapshot() -> int:
+    """
+    Rebuild the graph snapshot from the JSON cache and memory-map the new one.
+    
+    Returns:
+        Number of users in the snapshot
+    """
+    global GRAPH_SNAPSHOT, _following_version, _follower_index, _follower_index_build
+    user_count = export_snapshot(CACHE_DIR, GRAPH_SNAPSHOT_PATH)
+    _following_version += 1
+    GRAPH_SNAPSHOT = load_snapshot(GRAPH_SNAPSHOT_PATH)
+    _following_arrays.clear()
+    # Indexed lists are now in the snapshot
+    _follower_index = None
+    _follower_index_build = None
+    _pending_index_updates.clear()
+    return user_count
+
+
 async def _make_request(
     client: httpx.AsyncClient,
     url: str,
-    headers: Dict,
     params: Dict,
-    max_retries: int = 3
+    bucket: str,
+    max_retries: int = 3,
+    deadline: Optional[float] = None
 ) -> httpx.Response:
     """
-    Make a request with retry logic for rate limits.
+    Make a request with the least-used credential, retrying on rate limits.
+    
+    A token that gets rate limited is benched until its window resets and
+    the request is retried on the next token in the pool. Each attempt's
+    timeout is cut short so that it never runs past the deadline.
     
     Args:
         client: HTTP client
         url: Request URL
-        headers: Request headers
         params: Request parameters
+        bucket: Rate limit bucket of the endpoint (e.g. "following", "users")
         max_retries: Maximum number of retries
+        deadline: time.monotonic() by which the request must be done (None for no deadline)
     
     Returns:
         HTTP response
     """
     for attempt in range(max_retries):
-        response = await client.get(url, headers=headers, params=params, timeout=30.0)
+        timeout = REQUEST_TIMEOUT
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise DeadlineExceededError("Request deadline exceeded before Twitter API responded")
+        
+        if not CIRCUIT_BREAKER.allow_request():
+            retry_after = CIRCUIT_BREAKER.retry_after()
+            raise CircuitOpenError(
+                f"Twitter API is failing, not sending requests for the next {retry_after} seconds.",
+                retry_after=retry_after
+            )
+        
+        token = CREDENTIAL_POOL.acquire(bucket)
+        if token is None:
+            retry_after = CREDENTIAL_POOL.retry_after(bucket)
+            raise RateLimitError(
+                f"Rate limit exceeded for {BUCKET_DESCRIPTIONS.get(bucket, bucket)} on every credential. "
+                f"Please wait {retry_after} seconds before trying again.",
+                retry_after=retry_after
+            )
+        
+        headers = {"Authorization": f"Bearer {token}"}
+        try:
+            # wait_for enforces the deadline even if the connection stalls between reads
+            response = await asyncio.wait_for(
+                client.get(url, headers=headers, params=params, timeout=timeout),
+                timeout=timeout
+            )
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            if deadline is not None and time.monotonic() >= deadline:
+                # Cut short by our own deadline, which says nothing about Twitter's health
+                raise DeadlineExceededError("Request deadline exceeded while waiting for Twitter API")
+            CIRCUIT_BREAKER.record_failure()
+            raise TwitterAPIError("Twitter API timed out")
+        except httpx.TransportError as e:
+            CIRCUIT_BREAKER.record_failure()
+            raise TwitterAPIError(f"Twitter API unreachable: {e}")
+        
+        # Only server errors count against the circuit, the API is up otherwise
+        if response.status_code >= 500:
+            CIRCUIT_BREAKER.record_failure()
+        else:
+            CIRCUIT_BREAKER.record_success()
+        CREDENTIAL_POOL.record_response(token, bucket, response.headers)
         
         if response.status_code == 429:
-            # Rate limit exceeded
-            retry_after = int(response.headers.get("x-rate-limit-reset", 900))
-            wait_time = min(2 ** attempt, 60)  # Exponential backoff, max 60 seconds
-            
-            if attempt < max_retries - 1:
-                await asyncio.sleep(wait_time)
-                continue
-            else:
-                raise RateLimitError(
-                    f"Rate limit exceeded. Twitter API free tier allows only 15 requests per 15 minutes for following lists. "
-                    f"Please wait {retry_after} seconds before trying again.",
-                    retry_after=retry_after
-                )
+            # Rate limit exceeded, bench this token and try the next one
+            reset_at = response.headers.get("x-rate-limit-reset")
+            CREDENTIAL_POOL.bench(token, bucket, float(reset_at) if reset_at else None)
+            continue
         
         response.raise_for_status()
         return response
     
-    raise TwitterAPIError("Failed to make request after retries")
+    retry_after = CREDENTIAL_POOL.retry_after(bucket)
+    raise RateLimitError(
+        f"Rate limit exceeded on {max_retries} credentials. "
+        f"Please wait {retry_after} seconds before trying again.",
+        retry_after=retry_after
+    )
 
 
-async def get_user_by_username(username: str, use_cache: bool = True) -> Optional[Dict]:
+def get_metrics() -> Dict:
+    """Get the state of the credential pool, circuit breaker, caches and indexes for monitoring."""
+    return {
+        "credentials": CREDENTIAL_POOL.snapshot(),
+        "circuit_breaker": CIRCUIT_BREAKER.snapshot(),
+        "cache": TTL_POLICY.stats(),
+        "follower_index": _follower_index.stats() if _follower_index is not None else None,
+        "identity_index": IDENTITY_INDEX.stats()
+    }
+
+
+def _cached_user_id(username: str) -> Optional[str]:
+    """Resolve a username to a user ID from the identity index, without calling Twitter."""
+    username = username.lower()
+    user_id = IDENTITY_INDEX.resolve(username)
+    if user_id is not None:
+        return user_id
+    
+    # Profiles cached before the identity index existed are keyed by username; move them
+    legacy_path = _get_cache_path(f"user_{username}")
+    try:
+        with open(legacy_path, 'r') as f:
+            user_id = json.load(f)["data"]["id"]
+    except (OSError, json.JSONDecodeError, KeyError, TypeError):
+        return None
+    legacy_path.replace(_get_cache_path(f"profile_{user_id}"))
+    IDENTITY_INDEX.record(user_id, username)
+    # The legacy file is gone now, so its entry must not wait for the next write
+    IDENTITY_INDEX.persist(force=True)
+    return user_id
+
+
+def _load_cached_user(username: str, allow_stale: bool = False) -> Optional[Dict]:
+    """Load a user's cached profile by username."""
+    user_id = _cached_user_id(username)
+    if user_id is None:
+        if not allow_stale:
+            TTL_POLICY.record_lookup("profile", hit=False)
+        return None
+    return _load_from_cache(f"profile_{user_id}", allow_stale=allow_stale)
+
+
+def _cache_user(user_data: Dict) -> None:
+    """Cache a profile under the user's ID and point their username at it."""
+    IDENTITY_INDEX.record(user_data["id"], user_data["username"])
+    _save_to_cache(f"profile_{user_data['id']}", user_data)
+
+
+async def get_user_by_username(
+    username: str,
+    use_cache: bool = True,
+    deadline: Optional[float] = None
+) -> Optional[Dict]:
     """
     Get user information by Twitter username (handle without @).
     
     Args:
         username: Twitter username (e.g., 'elonmusk')
         use_cache: Whether to use cached data if available
+        deadline: time.monotonic() by which the lookup must be done
     
     Returns:
         Dictionary with user data including id, name, username, profile_image_url, description
     """
-    cache_key = f"user_{username.lower()}"
-    
     # Try to load from cache first
     if use_cache:
-        cached_user = _load_from_cache(cache_key)
+        if IDENTITY_INDEX.is_missing(username):
+            return None
+        cached_user = _load_cached_user(username)
         if cached_user:
             return cached_user
     
-    headers = {"Authorization": f"Bearer {BEARER_TOKEN}"}
     params = {
         "user.fields": "id,name,username,profile_image_url,description,public_metrics"
     }
@@ -153,33 +509,121 @@ async def get_user_by_username(username: str, use_cache: bool = True) -> Optiona
             response = await _make_request(
                 client,
                 f"{TWITTER_API_BASE}/users/by/username/{username}",
-                headers,
-                params
+                params,
+                bucket="users_by_username",
+                deadline=deadline
             )
             data = response.json()
             user_data = data.get("data")
             
-            # Save to cache
+            # Save to cache (suspended accounts come back as errors without data)
             if user_data and use_cache:
-                _save_to_cache(cache_key, user_data)
+                _cache_user(user_data)
+            elif not user_data:
+                IDENTITY_INDEX.record_missing(username)
             
             return user_data
         except RateLimitError as e:
             # If rate limited, try to return cached data even if expired
-            cached_user = _load_from_cache(cache_key)
+            cached_user = _load_cached_user(username, allow_stale=True)
             if cached_user:
                 return cached_user
             raise
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
+                IDENTITY_INDEX.record_missing(username)
                 return None
             raise TwitterAPIError(f"Twitter API error: {e.response.status_code} - {e.response.text}")
 
 
+async def get_users_by_usernames(
+    usernames: List[str],
+    use_cache: bool = True,
+    deadline: Optional[float] = None
+) -> Dict[str, Optional[Dict]]:
+    """
+    Get user information for many Twitter usernames at once.
+    
+    Cache hits are served locally and the misses are looked up in groups of
+    up to 100 per call to /users/by, so N usernames cost ceil(misses / 100)
+    upstream calls instead of N. Every user found is cached like
+    get_user_by_username does.
+    
+    Args:
+        usernames: Twitter usernames (handles without @)
+        use_cache: Whether to use cached data if available
+        deadline: time.monotonic() by which the lookups must be done
+    
+    Returns:
+        Lowercased username -> user data, or None if the user doesn't exist
+        or the username isn't a valid handle
+    """
+    # Deduplicate case-insensitively, keeping the request order
+    lookups = list(dict.fromkeys(username.lower() for username in usernames if username))
+    users: Dict[str, Optional[Dict]] = {}
+    
+    misses = []
+    for username in lookups:
+        if not USERNAME_PATTERN.fullmatch(username):
+            # Never sent upstream, where it would fail the batch it's in
+            users[username] = None
+            continue
+        if use_cache and IDENTITY_INDEX.is_missing(username):
+            users[username] = None
+            continue
+        cached_user = _load_cached_user(username) if use_cache else None
+        if cached_user:
+            users[username] = cached_user
+        else:
+            misses.append(username)
+    
+    params = {
+        "user.fields": "id,name,username,profile_image_url,description,public_metrics"
+    }
+    
+    async with httpx.AsyncClient() as client:
+        for i in range(0, len(misses), 100):
+            batch = misses[i:i+100]
+            try:
+                response = await _make_request(
+                    client,
+                    f"{TWITTER_API_BASE}/users/by",
+                    {**params, "usernames": ",".join(batch)},
+                    bucket="users_by",
+                    deadline=deadline
+                )
+            except RateLimitError:
+                # If rate limited, fall back to expired cache entries for the rest
+                for username in misses[i:]:
+                    cached_user = _load_cached_user(username, allow_stale=True)
+                    if not cached_user:
+                        raise
+                    users[username] = cached_user
+                break
+            except httpx.HTTPStatusError as e:
+                raise TwitterAPIError(f"Twitter API error: {e.response.status_code} - {e.response.text}")
+            
+            data = response.json()
+            for user_data in data.get("data", []):
+                username = user_data["username"].lower()
+                users[username] = user_data
+                if use_cache:
+                    _cache_user(user_data)
+            
+            # Usernames that don't exist come back in "errors" instead of "data"
+            for username in batch:
+                if username not in users:
+                    users[username] = None
+                    IDENTITY_INDEX.record_missing(username)
+    
+    return {username: users[username] for username in lookups}
+
+
 async def get_user_following_ids(
     user_id: str,
     max_results: int = 500,  # Reduced default to avoid hitting rate limits
-    use_cache: bool = True
+    use_cache: bool = True,
+    deadline: Optional[float] = None
 ) -> List[str]:
     """
     Get list of user IDs that a user is following.
@@ -191,16 +635,17 @@ async def get_user_following_ids(
         user_id: Twitter user ID
         max_results: Maximum number of results to return (default: 500)
         use_cache: Whether to use cached data if available
+        deadline: time.monotonic() by which the list must be fetched
     """
+    global _following_version
     cache_key = f"following_{user_id}_{max_results}"
     
     # Try to load from cache first
     if use_cache:
-        cached_following = _load_from_cache(cache_key)
+        cached_following = _load_following_from_cache(user_id, max_results)
         if cached_following:
             return cached_following
     
-    headers = {"Authorization": f"Bearer {BEARER_TOKEN}"}
     following_ids = []
     next_token = None
     request_count = 0
@@ -216,8 +661,9 @@ async def get_user_following_ids(
                 response = await _make_request(
                     client,
                     f"{TWITTER_API_BASE}/users/{user_id}/following",
-                    headers,
-                    params
+                    params,
+                    bucket="following",
+                    deadline=deadline
                 )
                 data = response.json()
                 request_count += 1
@@ -232,7 +678,7 @@ async def get_user_following_ids(
                     
             except RateLimitError as e:
                 # If rate limited, try to return cached data even if expired
-                cached_following = _load_from_cache(cache_key)
+                cached_following = _load_from_cache(cache_key, allow_stale=True)
                 if cached_following:
                     return cached_following
                 raise RateLimitError(
@@ -245,22 +691,272 @@ async def get_user_following_ids(
     if use_cache and following_ids:
         _save_to_cache(cache_key, following_ids)
     
+    if following_ids:
+        _following_version += 1
+        _store_following_sketch(user_id, following_ids)
+        _following_arrays.pop(user_id, None)
+        _get_following_written_at()[user_id] = time.time()
+        if _follower_index is not None:
+            _follower_index.update(user_id, following_ids, time.time(), max_results)
+        elif _follower_index_build is not None:
+            _pending_index_updates.append((user_id, following_ids, time.time(), max_results))
+    
     return following_ids
 
 
-async def get_users_by_ids(user_ids: List[str], use_cache: bool = True) -> List[Dict]:
+def _store_following_sketch(user_id: str, following_ids: List[str]) -> Dict:
+    """Compute and cache the MinHash sketch of a user's following set."""
+    sketch = compute_sketch(following_ids)
+    _following_sketches[user_id] = sketch
+    _save_to_cache(f"sketch_{user_id}", sketch)
+    return sketch
+
+
+def get_following_sketch(user_id: str) -> Optional[Dict]:
+    """
+    Get the MinHash sketch of a user's following set without calling Twitter.
+    
+    Following lists cached before sketches existed are sketched once on first use.
+    
+    Args:
+        user_id: Twitter user ID
+    
+    Returns:
+        The sketch, or None if the user's following list was never fetched
+    """
+    if user_id in _following_sketches:
+        return _following_sketches[user_id]
+    
+    sketch = _load_from_cache(f"sketch_{user_id}", allow_stale=True)
+    if sketch:
+        _following_sketches[user_id] = sketch
+        return sketch
+    
+    cached_following = get_cached_following(user_id)
+    if cached_following:
+        return _store_following_sketch(user_id, cached_following)
+    
+    return None
+
+
+def get_cached_following(user_id: str) -> Optional[List[str]]:
+    """
+    Get the largest cached following list of a user, fresh or stale, without calling Twitter.
+    
+    Args:
+        user_id: Twitter user ID
+    """
+    entry = _snapshot_row(user_id)
+    if entry is not None:
+        return [str(followed_id) for followed_id in entry[0].tolist()]
+    
+    cache_paths = sorted(
+        CACHE_DIR.glob(f"following_{user_id}_*.json"),
+        key=lambda cache_path: int(cache_path.stem.rsplit("_", 1)[1]),
+        reverse=True
+    )
+    for cache_path in cache_paths:
+        cached_following = _load_from_cache(cache_path.stem, allow_stale=True)
+        if cached_following:
+            return cached_following
+    return None
+
+
+def get_cached_following_user_ids() -> List[str]:
+    """Get the IDs of every user whose following list is cached."""
+    user_ids = {cache_path.stem.split("_")[1] for cache_path in CACHE_DIR.glob("following_*_*.json")}
+    if GRAPH_SNAPSHOT is not None:
+        user_ids.update(GRAPH_SNAPSHOT.user_ids())
+    return sorted(user_ids)
+
+
+def get_cohort_overlap(
+    usernames: Optional[List[str]] = None,
+    top_k: int = 5,
+    min_overlap: int = 1
+) -> Dict:
+    """
+    Compute every pairwise mutual count in a cohort from cached following lists.
+    
+    Args:
+        usernames: Users in the cohort (defaults to every user with a cached following list)
+        top_k: Maximum number of links returned per user
+        min_overlap: Minimum number of shared followees for a link
+    
+    Returns:
+        Dictionary with the cohort's users and each user's strongest links
+    
+    Raises:
+        ValueError: If a requested user or their following list is not cached
+    """
+    users = []
+    if usernames is None:
+        users = [{"id": user_id} for user_id in get_cached_following_user_ids()]
+    else:
+        for username in usernames:
+            user = _load_cached_user(username, allow_stale=True)
+            if not user:
+                raise ValueError(f"User '{username}' is not cached")
+            users.append({"id": user["id"], "username": user["username"]})
+    
+    following = {}
+    for user in users:
+        if user["id"] not in _following_arrays:
+            # Rows of the memory-mapped snapshot are used in place
+            entry = _snapshot_row(user["id"])
+            if entry is not None:
+                _following_arrays[user["id"]] = entry[0]
+        if user["id"] not in _following_arrays:
+            cached_following = get_cached_following(user["id"])
+            if cached_following is None:
+                if usernames is not None:
+                    raise ValueError(f"Following list of '{user['username']}' is not cached")
+                continue
+            _following_arrays[user["id"]] = np.asarray(cached_following, dtype=np.int64)
+        following[user["id"]] = _following_arrays[user["id"]]
+    
+    return {
+        "users": [user for user in users if user["id"] in following],
+        "links": cohort.top_links(following, top_k=top_k, min_overlap=min_overlap)
+    }
+
+
+def get_cohort_layout(method: str = "force", top_k: int = 5) -> Dict:
+    """
+    Lay out every user with a cached following list for the Universe view.
+    
+    Users are placed on rings by the total strength of their links (the top 10%
+    innermost, then the next 30%, then everyone else) and pulled towards the
+    users they share the most followees with. Layouts are cached and extended
+    incrementally when new users are crawled.
+    
+    Args:
+        method: "ring" or "force"
+        top_k: Links per user used as springs in the force layout
+    
+    Returns:
+        Compact layout with parallel "ids", "x", "y" and "ring" lists
+    """
+    # Serve the cached layout when no following list changed since it was computed
+    cache_key = f"cohort_{top_k}"
+    if _layout_versions.get((cache_key, method)) == _following_version:
+        cached_layout = layout.get_cached_layout(cache_key, get_cached_following_user_ids(), method=method)
+        if cached_layout is not None:
+            return cached_layout
+    
+    version = _following_version
+    cohort_data = get_cohort_overlap(top_k=top_k)
+    node_ids = [user["id"] for user in cohort_data["users"]]
+    strength = {
+        user_id: sum(link["overlap"] for link in links)
+        for user_id, links in cohort_data["links"].items()
+    }
+    
+    ranked = sorted(node_ids, key=lambda user_id: strength.get(user_id, 0), reverse=True)
+    ring_of = {}
+    for rank, user_id in enumerate(ranked):
+        fraction = rank / len(ranked)
+        ring_of[user_id] = 1 if fraction < 0.1 else 2 if fraction < 0.4 else 3
+    
+    edges = [
+        (user_id, link["id"], link["overlap"])
+        for user_id, links in cohort_data["links"].items()
+        for link in links
+    ]
+    cohort_layout = layout.get_layout(
+        cache_key,
+        node_ids,
+        [ring_of[user_id] for user_id in node_ids],
+        edges,
+        method=method
+    )
+    _layout_versions[(cache_key, method)] = version
+    return cohort_layout
+
+
+def estimate_mutual_overlap(usernames: List[str]) -> Dict:
+    """
+    Estimate how many accounts two or more users all follow, and how similar
+    their following sets are, using only cached sketches (no Twitter calls).
+    
+    Args:
+        usernames: Twitter usernames whose following lists have been fetched before
+    
+    Returns:
+        Dictionary with the users, Jaccard similarity, overlap count and error bounds
+    
+    Raises:
+        ValueError: If a user or their following list is not cached
+    """
+    users = []
+    sketches = []
+    for username in usernames:
+        user = _load_cached_user(username, allow_stale=True)
+        if not user:
+            raise ValueError(f"User '{username}' is not cached")
+        sketch = get_following_sketch(user["id"])
+        if not sketch:
+            raise ValueError(f"Following list of '{username}' is not cached")
+        users.append({
+            "id": user["id"],
+            "username": user["username"],
+            "following_count": sketch["size"]
+        })
+        sketches.append(sketch)
+    
+    return {
+        "users": users,
+        **estimate_overlap(sketches),
+        "sketch_size": min(sketch["k"] for sketch in sketches)
+    }
+
+
+def _record_identities(users: List[Dict]) -> None:
+    """
+    Point the identity index at the usernames of hydrated users. A user seen
+    under a new handle gets their cached profile refreshed with it, so the new
+    handle resolves without another lookup.
+    """
+    for user in users:
+        if IDENTITY_INDEX.record(user["id"], user["username"]) and _get_cache_path(f"profile_{user['id']}").exists():
+            _save_to_cache(f"profile_{user['id']}", user)
+
+
+def _users_cache_key(user_ids: List[str]) -> str:
+    """Cache key of a hydrated batch, independent of the order of the IDs."""
+    return f"users_{'_'.join(sorted(user_ids)[:10])}"  # Use the 10 lowest IDs for key
+
+
+def _hydration_cached(user_ids: List[str]) -> bool:
+    """Whether get_users_by_ids can answer for these IDs from a fresh cached batch."""
+    cached_users = _load_from_cache(_users_cache_key(user_ids), record=False)
+    if not cached_users:
+        return False
+    cached_ids = {user["id"] for user in cached_users}
+    return all(user_id in cached_ids for user_id in user_ids)
+
+
+async def get_users_by_ids(
+    user_ids: List[str],
+    use_cache: bool = True,
+    deadline: Optional[float] = None
+) -> List[Dict]:
     """
     Get user information for multiple user IDs.
     
     Args:
         user_ids: List of Twitter user IDs
         use_cache: Whether to use cached data if available
+        deadline: time.monotonic() by which the users must be fetched
+    
+    Raises:
+        DeadlineExceededError: With the users fetched so far as partial_result
     """
     if not user_ids:
         return []
     
     # Create cache key from sorted user IDs
-    cache_key = f"users_{'_'.join(sorted(user_ids[:10]))}"  # Use first 10 IDs for key
+    cache_key = _users_cache_key(user_ids)
     
     # Try to load from cache first
     if use_cache:
@@ -271,7 +967,6 @@ async def get_users_by_ids(user_ids: List[str], use_cache: bool = True) -> List[
             if all(uid in cached_ids for uid in user_ids):
                 return cached_users
     
-    headers = {"Authorization": f"Bearer {BEARER_TOKEN}"}
     all_users = []
     
     async with httpx.AsyncClient() as client:
@@ -286,16 +981,21 @@ async def get_users_by_ids(user_ids: List[str], use_cache: bool = True) -> List[
                 response = await _make_request(
                     client,
                     f"{TWITTER_API_BASE}/users",
-                    headers,
-                    params
+                    params,
+                    bucket="users",
+                    deadline=deadline
                 )
                 data = response.json()
                 
                 if "data" in data:
                     all_users.extend(data["data"])
+                    _record_identities(data["data"])
+            except DeadlineExceededError as e:
+                # Out of time, hand back the batches hydrated so far (not cached)
+                raise DeadlineExceededError(str(e), partial_result=all_users)
             except RateLimitError as e:
                 # If we hit rate limit here, return what we have (or cached data)
-                cached_users = _load_from_cache(cache_key)
+                cached_users = _load_from_cache(cache_key, allow_stale=True)
                 if cached_users:
                     return cached_users
                 break
@@ -307,10 +1007,162 @@ async def get_users_by_ids(user_ids: List[str], use_cache: bool = True) -> List[
     return all_users
 
 
+class BudgetExceededError(TwitterAPIError):
+    """Raised when no query plan fits within the upstream call budget."""
+    def __init__(self, message: str, plan: Optional[Dict] = None):
+        super().__init__(message)
+        self.plan = plan
+
+
+def _following_pages(user: Dict, max_results: int) -> int:
+    """Estimate how many upstream pages fetching a user's following list costs."""
+    following_count = user.get("public_metrics", {}).get("following_count", max_results)
+    entries = min(following_count, max_results)
+    if entries <= 0:
+        return 0
+    return math.ceil(entries / 1000)
+
+
+def _hydration_calls(mutual_count: int) -> int:
+    """Estimate how many /users calls hydrating a list of mutuals costs."""
+    return math.ceil(mutual_count / 100)
+
+
+def plan_mutual_following(
+    user1: Dict,
+    user2: Dict,
+    max_calls: Optional[int] = None,
+    max_results: int = 500,
+    use_cache: bool = True
+) -> Dict:
+    """
+    Choose how to answer a mutuals query within a call budget, before calling Twitter.
+    
+    Costs are counted in upstream calls and estimated from the cache and from
+    `public_metrics.following_count`. The candidate strategies are:
+    - cached: a fresh mutuals result for the pair is already cached
+    - full: fetch both following lists and intersect them
+    - smaller_side: fetch only the smaller list and intersect it with a stale
+      cached copy of the larger one
+    - approximate: answer from stale cached data only
+    
+    Of the strategies within max_calls, the most accurate one is chosen (the
+    cheapest of equally accurate ones), so a tighter budget trades accuracy
+    for fewer calls and no budget always gets an exact answer.
+    
+    Args:
+        user1: First user's data (as returned by get_user_by_username)
+        user2: Second user's data
+        max_calls: Upstream call budget (None for unlimited)
+        max_results: Maximum following entries fetched per user
+        use_cache: Whether cached data may be used
+    
+    Returns:
+        The chosen plan, with its estimated cost and the options considered
+    
+    Raises:
+        BudgetExceededError: If no strategy fits within max_calls
+    """
+    mutuals_key = f"mutuals_{user1['id']}_{user2['id']}"
+    options = []
+    
+    fresh_lists = {}
+    stale_lists = {}
+    if use_cache:
+        for user in (user1, user2):
+            # Only checks what is cached, the lookups that avoid a fetch are counted when the plan runs
+            fresh_lists[user["id"]] = _load_following_from_cache(user["id"], max_results, record=False)
+            stale_lists[user["id"]] = fresh_lists[user["id"]] or _load_following_from_cache(
+                user["id"], max_results, allow_stale=True, record=False
+            )
+        
+        if _load_from_cache(mutuals_key, record=False):
+            options.append({"strategy": "cached", "cost": 0, "exact": True})
+    
+    def list_cost(user: Dict) -> int:
+        if fresh_lists.get(user["id"]) is not None:
+            return 0
+        return _following_pages(user, max_results)
+    
+    def hydration_cost(lists: Dict) -> int:
+        # Exact when both lists are known (and free if the mutuals' profiles are
+        # cached), otherwise bounded by the smaller list
+        list1 = lists.get(user1["id"])
+        list2 = lists.get(user2["id"])
+        if list1 is not None and list2 is not None:
+            mutual_ids = list(set(list1) & set(list2))
+            if not mutual_ids or _hydration_cached(mutual_ids):
+                return 0
+            return _hydration_calls(len(mutual_ids))
+        counts = [
+            min(user.get("public_metrics", {}).get("following_count", max_results), max_results)
+            for user in (user1, user2)
+        ]
+        return _hydration_calls(min(counts))
+    
+    options.append({
+        "strategy": "full",
+        "cost": list_cost(user1) + list_cost(user2) + hydration_cost(fresh_lists),
+        "exact": True
+    })
+    
+    # Only fetch the smaller side when the larger side has a stale copy to verify against
+    smaller, larger = sorted(
+        (user1, user2),
+        key=lambda user: user.get("public_metrics", {}).get("following_count", max_results)
+    )
+    if fresh_lists.get(larger["id"]) is None and stale_lists.get(larger["id"]) is not None:
+        options.append({
+            "strategy": "smaller_side",
+            "cost": list_cost(smaller) + hydration_cost(stale_lists),
+            "exact": False,
+            "fetch": smaller["username"]
+        })
+    
+    stale_mutuals = _load_from_cache(mutuals_key, allow_stale=True, record=False) if use_cache else None
+    if stale_mutuals or (use_cache and all(stale_lists.get(user["id"]) is not None for user in (user1, user2))):
+        options.append({
+            "strategy": "approximate",
+            "cost": 0 if stale_mutuals else hydration_cost(stale_lists),
+            "exact": False
+        })
+    
+    # Cheapest first, preferring exact answers when costs tie
+    options.sort(key=lambda option: (option["cost"], not option["exact"]))
+    affordable = [option for option in options if max_calls is None or option["cost"] <= max_calls]
+    
+    # Within budget, a more accurate answer beats a cheaper one; the budget is
+    # what trades accuracy for cost, so without one stale data is never preferred
+    accuracy = {"cached": 0, "full": 0, "smaller_side": 1, "approximate": 2}
+    affordable.sort(key=lambda option: (accuracy[option["strategy"]], option["cost"]))
+    chosen = affordable[0] if affordable else None
+    
+    plan = {
+        "strategy": chosen["strategy"] if chosen else None,
+        "cost": chosen["cost"] if chosen else None,
+        "exact": chosen["exact"] if chosen else None,
+        "budget": max_calls,
+        "max_results": max_results,
+        "options": options
+    }
+    if chosen is None:
+        raise BudgetExceededError(
+            f"No query plan fits within {max_calls} upstream calls. "
+            f"The cheapest plan needs {options[0]['cost']} calls.",
+            plan=plan
+        )
+    if chosen.get("fetch"):
+        plan["fetch"] = chosen["fetch"]
+    
+    return plan
+
+
 async def get_mutual_following(
     username1: str,
     username2: str,
-    use_cache: bool = True
+    use_cache: bool = True,
+    plan: Optional[Dict] = None,
+    deadline: Optional[float] = None
 ) -> List[Dict]:
     """
     Get mutual accounts that both users follow.
@@ -319,39 +1171,96 @@ async def get_mutual_following(
         username1: First Twitter username
         username2: Second Twitter username
         use_cache: Whether to use cached data if available
-    """
-    cache_key = f"mutuals_{username1.lower()}_{username2.lower()}"
-    
-    # Try to load from cache first
-    if use_cache:
-        cached_mutuals = _load_from_cache(cache_key)
-        if cached_mutuals:
-            return cached_mutuals
+        plan: Query plan from plan_mutual_following (planned here if not given)
+        deadline: time.monotonic() by which the mutuals must be fetched
     
+    Raises:
+        DeadlineExceededError: With the mutuals hydrated so far as partial_result
+    """
     # Get user IDs
-    user1 = await get_user_by_username(username1, use_cache=use_cache)
-    user2 = await get_user_by_username(username2, use_cache=use_cache)
+    user1 = await get_user_by_username(username1, use_cache=use_cache, deadline=deadline)
+    user2 = await get_user_by_username(username2, use_cache=use_cache, deadline=deadline)
     
     if not user1:
         raise ValueError(f"User '{username1}' not found")
     if not user2:
         raise ValueError(f"User '{username2}' not found")
     
-    user1_id = user1["id"]
-    user2_id = user2["id"]
+    # Keyed by ID, so cached results survive either user changing their handle
+    cache_key = f"mutuals_{user1['id']}_{user2['id']}"
     
-    # Get following lists (limited to reduce API calls)
-    following1 = await get_user_following_ids(user1_id, max_results=500, use_cache=use_cache)
-    following2 = await get_user_following_ids(user2_id, max_results=500, use_cache=use_cache)
+    # Try to load from cache first
+    if use_cache and (plan is None or plan["strategy"] == "cached"):
+        cached_mutuals = _load_from_cache(cache_key)
+        if cached_mutuals:
+            return cached_mutuals
     
-    # Find mutuals (accounts both users follow)
-    mutual_ids = list(set(following1) & set(following2))
+    if plan is None:
+        plan = plan_mutual_following(user1, user2, use_cache=use_cache)
+    max_results = plan.get("max_results", 500)
+    
+    if plan["strategy"] == "approximate":
+        stale_mutuals = _load_from_cache(cache_key, allow_stale=True)
+        if stale_mutuals:
+            return stale_mutuals
+    
+    async def following_for(user: Dict) -> List[str]:
+        if plan["strategy"] == "approximate" or (
+            plan["strategy"] == "smaller_side" and user["username"] != plan.get("fetch")
+        ):
+            return _load_following_from_cache(user["id"], max_results, allow_stale=True) or []
+        if _following_pages(user, max_results) == 0:
+            # Nothing to fetch for accounts that follow nobody
+            return []
+        return await get_user_following_ids(
+            user["id"],
+            max_results=max_results,
+            use_cache=use_cache,
+            deadline=deadline
+        )
+    
+    # When both users are crawled, intersect their lists without fetching or parsing:
+    # straight from the memory-mapped snapshot when both are in it, otherwise
+    # from the follower index if it's already built. Building it here would
+    # parse every cached list; following_for reads just these two instead
+    indexed1 = indexed2 = None
+    if use_cache and plan["strategy"] != "smaller_side":
+        allow_stale = plan["strategy"] == "approximate"
+        indexed1 = _snapshot_following(user1["id"], max_results, allow_stale, record=False)
+        indexed2 = _snapshot_following(user2["id"], max_results, allow_stale, record=False)
+        if (indexed1 is None or indexed2 is None) and _follower_index is not None:
+            index = _follower_index
+            indexed1 = _matching_following(
+                user1["id"], index.following(user1["id"]), max_results, allow_stale, record=False
+            )
+            indexed2 = _matching_following(
+                user2["id"], index.following(user2["id"]), max_results, allow_stale, record=False
+            )
+    if indexed1 is not None and indexed2 is not None:
+        # Two following list fetches avoided; when only one list is indexed,
+        # get_user_following_ids counts its hit instead
+        if plan["strategy"] != "approximate":
+            TTL_POLICY.record_lookup("following", hit=True)
+            TTL_POLICY.record_lookup("following", hit=True)
+        mutual_ids = [
+            str(followed_id)
+            for followed_id in np.intersect1d(indexed1, indexed2, assume_unique=True).tolist()
+        ]
+    else:
+        # Get following lists (limited to reduce API calls)
+        following1 = await following_for(user1)
+        following2 = await following_for(user2)
+        
+        # Find mutuals (accounts both users follow)
+        # Sorted like the intersection above, so the hydrated batches and the
+        # cached result don't depend on set iteration order (PYTHONHASHSEED)
+        mutual_ids = sorted(set(following1) & set(following2), key=int)
     
     # Get full user info for mutuals
-    mutual_users = await get_users_by_ids(mutual_ids, use_cache=use_cache)
+    mutual_users = await get_users_by_ids(mutual_ids, use_cache=use_cache, deadline=deadline)
     
-    # Save to cache
-    if use_cache and mutual_users:
+    # Save to cache (approximate answers are not cached as fresh results)
+    if use_cache and mutual_users and plan["exact"]:
         _save_to_cache(cache_key, mutual_users)
     
     return mutual_users
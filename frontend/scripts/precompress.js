@@ -0,0 +1,34 @@
+/*
+Writes Brotli (.br) and gzip (.gz) copies of every compressible file in the build
+output, so the backend can serve them without compressing on each request.
+Runs automatically after `npm run build`.
+*/
+import { readdirSync, readFileSync, statSync, writeFileSync } from "node:fs";
+import { extname, join } from "node:path";
+import { brotliCompressSync, constants, gzipSync } from "node:zlib";
+
+const COMPRESSIBLE = new Set([".html", ".js", ".css", ".svg", ".json", ".txt", ".map"]);
+// Small files don't get smaller enough to be worth it
+const MINIMUM_SIZE = 1024;
+
+function precompress(directory) {
+	for (const name of readdirSync(directory)) {
+		const path = join(directory, name);
+		if (statSync(path).isDirectory()) {
+			precompress(path);
+			continue;
+		}
+		if (!COMPRESSIBLE.has(extname(name)) || statSync(path).size < MINIMUM_SIZE) {
+			continue;
+		}
+
+		const content = readFileSync(path);
+		writeFileSync(
+			`${path}.br`,
+			brotliCompressSync(content, { params: { [constants.BROTLI_PARAM_QUALITY]: 11 } }),
+		);
+		writeFileSync(`${path}.gz`, gzipSync(content, { level: 9 }));
+	}
+}
+
+precompress(process.argv[2] ?? "dist");
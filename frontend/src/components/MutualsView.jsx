@@ -513,7 +513,7 @@ function MutualsView({ friend, stars, selectedStarIndex, starPosition, onClose,
 							</div>
 							<div className="tooltip-right">
 								<img
-									src={hoveredFriend.profilePicture}
+									src={`/api/images?url=${encodeURIComponent(hoveredFriend.profilePicture)}&size=128`}
 									alt={hoveredFriend.username}
 									className="tooltip-profile-picture"
 								/>
@@ -442,7 +442,7 @@ function Universe({ onReturnClick, currentUsername }) {
 							</div>
 							<div className="tooltip-right">
 								<img
-									src={hoveredFriend.profilePicture}
+									src={`/api/images?url=${encodeURIComponent(hoveredFriend.profilePicture)}&size=128`}
 									alt={hoveredFriend.username}
 									className="tooltip-profile-picture"
 								/>